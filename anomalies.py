@@ -0,0 +1,74 @@
+import sys
+from sqlalchemy import text
+from refresh import refresh_incremental, start_refresher
+
+# ---------------------------------------------------------
+# INCREMENTAL ANOMALY DETECTION (hr_attendance_anomaly)
+# ---------------------------------------------------------
+# Each run re-evaluates only the employee-days with swipes written (or removed)
+# since the stored watermark. Anomalies that still hold are upserted as 'open'; open ones
+# that no longer hold (an open session that got its check-out) are marked
+# 'resolved'. The watermark and locking are shared with rollup.py (see refresh.py).
+
+WATERMARK_NAME = 'attendance_anomaly'
+ADVISORY_LOCK_KEY = 48151624
+
+DETECT = text("""
+    WITH touched AS (
+        SELECT DISTINCT employee_id, DATE(check_in) as day
+        FROM hr_attendance
+        WHERE (CAST(:since AS timestamp) IS NULL OR write_date >= :since)
+          AND check_in IS NOT NULL AND employee_id IS NOT NULL
+        UNION
+        SELECT employee_id, day FROM hr_attendance_changes
+        WHERE CAST(:since AS timestamp) IS NOT NULL AND changed_at >= :since AND employee_id IS NOT NULL
+    ),
+    facts AS (
+        SELECT t.employee_id, t.day, MIN(a.check_in) as first_check_in, COUNT(a.id) as swipe_count,
+            COUNT(a.id) FILTER (WHERE a.check_out IS NULL) as open_sessions
+        FROM touched t
+        LEFT JOIN hr_attendance a ON a.employee_id = t.employee_id AND a.check_in >= t.day AND a.check_in < t.day + 1
+        GROUP BY t.employee_id, t.day
+    ),
+    flags AS (
+        SELECT f.*, k.kind, k.hit
+        FROM facts f CROSS JOIN LATERAL (VALUES
+            ('missed_checkout', f.open_sessions > 0),
+            ('multiple_checkin', f.swipe_count > 1)
+        ) AS k(kind, hit)
+    ),
+    detected AS (
+        INSERT INTO hr_attendance_anomaly (day, kind, employee_id, first_check_in, swipe_count, open_sessions)
+        SELECT day, kind, employee_id, first_check_in, swipe_count, open_sessions FROM flags WHERE hit
+        ON CONFLICT (day, kind, employee_id) DO UPDATE SET
+            first_check_in = EXCLUDED.first_check_in, swipe_count = EXCLUDED.swipe_count,
+            open_sessions = EXCLUDED.open_sessions, status = 'open', resolved_at = NULL
+        RETURNING 1
+    ),
+    resolved AS (
+        UPDATE hr_attendance_anomaly x SET
+            swipe_count = f.swipe_count, open_sessions = f.open_sessions,
+            status = 'resolved', resolved_at = now()
+        FROM flags f
+        WHERE NOT f.hit AND x.status = 'open'
+          AND x.day = f.day AND x.kind = f.kind AND x.employee_id = f.employee_id
+        RETURNING 1
+    )
+    SELECT (SELECT COUNT(*) FROM detected) as detected, (SELECT COUNT(*) FROM resolved) as resolved
+""")
+
+def _detect(conn, since):
+    if since is None: conn.execute(text("TRUNCATE hr_attendance_anomaly"))
+    return tuple(conn.execute(DETECT, {'since': since}).one())
+
+def detect_anomalies(full=False):
+    """Brings hr_attendance_anomaly up to date; returns (anomalies upserted as open, anomalies resolved)."""
+    return refresh_incremental(WATERMARK_NAME, ADVISORY_LOCK_KEY, _detect, full) or (0, 0)
+
+def start_anomaly_detector(interval_seconds=60):
+    """Runs the detector on a daemon thread every `interval_seconds`."""
+    return start_refresher(detect_anomalies, 'attendance-anomaly', interval_seconds)
+
+if __name__ == '__main__':
+    detected, resolved = detect_anomalies(full='--full' in sys.argv)
+    print(f"{detected} open anomaly row(s) written, {resolved} resolved.")
@@ -1,19 +1,33 @@
 import dash
 from dash import dcc, html, Input, Output, State
 import dash_bootstrap_components as dbc
+import diskcache
+import os
 import urllib.parse
-import pandas as pd
-from utils import db_connection 
+from utils import resolve_user_context, data_version, start_reference_refresher, pool_stats, cache_stats, private_dir, CACHE_ROOT, USE_ATTENDANCE_ROLLUP, USE_ANOMALY_STORE, USE_MANDAYS_LEDGER
+from rollup import start_rollup_refresher
+from anomalies import start_anomaly_detector
+from ledger import start_ledger_refresher
+from exports import init_exports
+from jobs import init_jobs
+from metrics import init_metrics, TimedDiskcacheManager
 
 # 1. Add Fonts
 FONT_INTER = "https://fonts.googleapis.com/css2?family=Inter:wght@300;400;600&display=swap"
 FONT_AWESOME = "https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.2/css/all.min.css"
 
+# 2. Background callbacks (background=True) run in separate processes, off the web workers.
+# Their results are kept on disk, keyed by inputs and utils.data_version(), and unpickled
+# on read: the directory must be private to the service user (utils.private_dir).
+BACKGROUND_CACHE_DIR = os.environ.get('HR_BACKGROUND_CACHE_DIR') or os.path.join(CACHE_ROOT, 'callbacks')
+background_callback_manager = TimedDiskcacheManager(diskcache.Cache(private_dir(BACKGROUND_CACHE_DIR)), cache_by=[data_version], expire=3600)
+
 app = dash.Dash(
     __name__, 
     use_pages=True, 
     external_stylesheets=[dbc.themes.BOOTSTRAP, FONT_AWESOME, FONT_INTER],
-    suppress_callback_exceptions=True
+    suppress_callback_exceptions=True,
+    background_callback_manager=background_callback_manager
 )
 server = app.server
 
@@ -92,36 +106,37 @@ def handle_login(search_str, current_data):
     if not target_id: 
         return {'empid': None, 'emp_name': 'Guest', 'locked': True, 'contractor_name': 'Not Logged In'}
 
+    # Same supervisor as the session already holds: nothing to resolve, and leaving
+    # the store untouched keeps every page callback that listens to it from re-firing
+    if current_data and not current_data.get('locked') and str(current_data.get('empid')) == str(target_id):
+        return dash.no_update
+
     try:
-        query = f"""
-        SELECT e.id, e.name, e.company_id, e.plant_id, e.contractor_id, c.contractor_name 
-        FROM hr_employee e LEFT JOIN plant_contractor c ON e.contractor_id = c.id
-        WHERE e.id = {target_id} AND e.active = true 
-        """
-        df = pd.read_sql(query, db_connection)
-        
-        if df.empty: 
-            return {'empid': None, 'locked': True}
-        
-        row = df.iloc[0]
-        c_name = row['contractor_name']
-        display_name = c_name if pd.notnull(c_name) else "Internal / All"
-        
-        return {
-            'empid': target_id,
-            'emp_name': row['name'],
-            'company_id': int(row['company_id']) if pd.notnull(row['company_id']) else None,
-            'plant_id': int(row['plant_id']) if pd.notnull(row['plant_id']) else None,
-            'contractor_id': int(row['contractor_id']) if pd.notnull(row['contractor_id']) else None,
-            'contractor_name': display_name,
-            'locked': False 
-        }
+        return resolve_user_context(target_id) or {'empid': None, 'locked': True}
     except Exception:
         return {'empid': None, 'locked': True}
 
-# --- 3. AZURE PRODUCTION RUNNER ---
+# --- 3. BACKGROUND REFRESH JOBS ---
+start_reference_refresher()
+if USE_ATTENDANCE_ROLLUP:
+    start_rollup_refresher()
+if USE_ANOMALY_STORE:
+    start_anomaly_detector()
+if USE_MANDAYS_LEDGER:
+    start_ledger_refresher()
+
+# --- 4. STREAMING CSV EXPORTS & REPORT JOBS ---
+init_exports(app)
+init_jobs(app)
+
+# --- 5. LATENCY METRICS (/metrics, slow-query log) ---
+init_metrics(app, gauges={'db_pool': pool_stats, 'result_cache': cache_stats})
+
+# --- 6. RUNNERS ---
+# Production: gunicorn -c gunicorn.conf.py app:server (preforked workers sharing one result cache).
+# `python app.py` is the single-process development server.
 if __name__ == '__main__':
-    app.run_server(host='0.0.0.0', port=8050, debug=False)
+    app.run(host='0.0.0.0', port=8050, debug=False)
 
 
 
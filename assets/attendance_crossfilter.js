@@ -0,0 +1,121 @@
+// Client-side cross-filtering for the Attendance breakdown charts.
+// The server ships the day's per-employee facts once (crossfilter-facts-store,
+// see pages/attendance.pack_facts); bar clicks, highlight colours and counts are
+// computed here without a round trip. Layout mirrors utils.apply_minimalist_style.
+(function () {
+    var BLUE = '#0d6efd';
+    var GREY = '#adb5bd';
+    var GRID = 'rgba(128, 128, 128, 0.2)';
+
+    // chart id -> [fact column, axis holding the clicked label]
+    var CHARTS = {
+        'department-bar-graph': ['dept_name', 'y'],
+        'gender-bar-graph': ['gender', 'x'],
+        'skills-bar-graph': ['skills', 'x'],
+        'shift-bar-graph': ['shift', 'x']
+    };
+
+    function axis(showgrid) {
+        return {showgrid: showgrid, gridwidth: 1, gridcolor: GRID, zeroline: false, showline: false, showticklabels: true};
+    }
+
+    function minimalistLayout(height, margin) {
+        return {
+            paper_bgcolor: 'rgba(0,0,0,0)',
+            plot_bgcolor: 'rgba(0,0,0,0)',
+            margin: margin,
+            height: height,
+            autosize: true,
+            font: {family: 'Inter, sans-serif', color: 'var(--text-main)'},
+            legend: {orientation: 'h', yanchor: 'bottom', y: 1.02, xanchor: 'right', x: 1, font: {color: 'var(--text-main)'}},
+            xaxis: axis(true),
+            yaxis: axis(true)
+        };
+    }
+
+    // Employees kept by the active cross-filter (a chart never filters itself)
+    function visibleRows(facts, filter, source) {
+        var keep = new Array(facts.n).fill(true);
+        if (!filter || filter.source === source || !facts[filter.col]) return keep;
+        var column = facts[filter.col];
+        var code = column.labels.indexOf(filter.val);
+        for (var i = 0; i < facts.n; i++) keep[i] = column.codes[i] === code;
+        return keep;
+    }
+
+    // Counts per label in label order, dropping empty labels (like a groupby)
+    function countBy(facts, col, keep, only) {
+        var column = facts[col];
+        var counts = new Array(column.labels.length).fill(0);
+        for (var i = 0; i < facts.n; i++) {
+            if (keep[i] && column.codes[i] >= 0 && (!only || only[i])) counts[column.codes[i]]++;
+        }
+        var labels = [], values = [];
+        column.labels.forEach(function (label, code) {
+            if (counts[code]) { labels.push(label); values.push(counts[code]); }
+        });
+        return {labels: labels, values: values};
+    }
+
+    // Same rule as pages/attendance.get_colors: grey out everything but the selected bar
+    function colors(labels, filter, source) {
+        var isSelf = filter && filter.source === source;
+        return labels.map(function (label) { return !isSelf || label === filter.val ? BLUE : GREY; });
+    }
+
+    function departmentFigure(facts, filter) {
+        var source = 'department-bar-graph';
+        var counts = countBy(facts, 'dept_name', visibleRows(facts, filter, source));
+        var order = counts.values.map(function (_, i) { return i; });
+        order.sort(function (a, b) { return counts.values[a] - counts.values[b] || a - b; });
+        var labels = order.map(function (i) { return counts.labels[i]; });
+        var values = order.map(function (i) { return counts.values[i]; });
+        if (!labels.length) return {data: [], layout: {title: {text: 'No Data'}}};
+
+        var layout = minimalistLayout(Math.max(350, labels.length * 35), {l: 150, r: 20, t: 10, b: 20});
+        layout.yaxis.showgrid = false;
+        layout.barmode = 'group';
+        return {
+            data: [{type: 'bar', y: labels, x: values, name: 'Present', orientation: 'h',
+                    marker: {color: colors(labels, filter, source)}, text: values, textposition: 'auto'}],
+            layout: layout
+        };
+    }
+
+    function columnFigure(facts, filter, col, source, minHeight, only) {
+        var counts = countBy(facts, col, visibleRows(facts, filter, source), only);
+        var layout = minimalistLayout(minHeight ? Math.max(minHeight, counts.labels.length * 35) : 300, {l: 40, r: 20, t: 10, b: 40});
+        layout.xaxis.showgrid = false;
+        return {
+            data: [{type: 'bar', x: counts.labels, y: counts.values,
+                    marker: {color: colors(counts.labels, filter, source)}, text: counts.values, textposition: 'auto'}],
+            layout: layout
+        };
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        attendance: {
+            interaction: function (deptClick, genderClick, skillsClick, shiftClick, clearClicks) {
+                var triggered = window.dash_clientside.callback_context.triggered;
+                if (!triggered || !triggered.length) return {};
+                var id = triggered[0].prop_id.split('.')[0];
+                var clicks = {
+                    'department-bar-graph': deptClick, 'gender-bar-graph': genderClick,
+                    'skills-bar-graph': skillsClick, 'shift-bar-graph': shiftClick
+                };
+                if (!CHARTS[id] || !clicks[id]) return {};
+                return {col: CHARTS[id][0], val: clicks[id].points[0][CHARTS[id][1]], source: id};
+            },
+
+            figures: function (facts, filter) {
+                if (!facts) return [{}, {}, {}, {}];
+                return [
+                    departmentFigure(facts, filter),
+                    columnFigure(facts, filter, 'gender', 'gender-bar-graph'),
+                    columnFigure(facts, filter, 'skills', 'skills-bar-graph'),
+                    columnFigure(facts, filter, 'shift', 'shift-bar-graph', 300, facts.shift_ok)
+                ];
+            }
+        }
+    });
+})();
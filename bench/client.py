@@ -0,0 +1,110 @@
+import json
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+# ---------------------------------------------------------
+# DASH CALLBACK CLIENT
+# ---------------------------------------------------------
+# Fires callbacks the way the browser does: POST /_dash-update-component with
+# the dependency's outputs, inputs and state, as listed by /_dash-dependencies.
+# Background callbacks are followed through their ?cacheKey=&job= polling until
+# the result arrives. Talks to an in-process Flask app (test client) or to a
+# running server (base URL).
+
+POLL_INTERVAL_SECONDS = 0.1
+POLL_TIMEOUT_SECONDS = 300
+
+class CallbackError(Exception):
+    pass
+
+class NoUpdate(CallbackError):
+    """The callback answered 204: PreventUpdate, or a background job that ended without a result."""
+
+class DashClient:
+    def __init__(self, server=None, base_url=None, prefix='/', poll_interval=POLL_INTERVAL_SECONDS, timeout=POLL_TIMEOUT_SECONDS):
+        if (server is None) == (base_url is None): raise ValueError("Pass either a Flask server or a base URL")
+        self.server = server
+        self.base_url = base_url.rstrip('/') if base_url else None
+        self.prefix = prefix
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.dependencies = [d for d in self.get_json('_dash-dependencies') if not d.get('clientside_function')]
+
+    # --- transport ---
+    def request(self, path, payload=None):
+        """(status, parsed JSON body or None) for a GET, or a POST when `payload` is given."""
+        url = self.prefix + path
+        if self.server is not None:
+            # A test client per request, so one DashClient can fire callbacks from several threads
+            client = self.server.test_client()
+            response = client.post(url, json=payload) if payload is not None else client.get(url)
+            body = response.get_data()
+            return response.status_code, json.loads(body) if body else None
+        data = json.dumps(payload).encode() if payload is not None else None
+        req = urllib.request.Request(self.base_url + url, data=data, headers={'Content-Type': 'application/json'} if data else {})
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                body = response.read()
+                return response.status, json.loads(body) if body else None
+        except urllib.error.HTTPError as e:
+            return e.code, None
+
+    def get_json(self, path):
+        status, body = self.request(path)
+        if status != 200: raise CallbackError(f"GET {path} returned {status}")
+        return body
+
+    # --- callbacks ---
+    def dependency(self, output):
+        """The callback whose output list contains `output` ('component-id.prop')."""
+        for dep in self.dependencies:
+            outputs = dep['output'].strip('.').split('...')
+            if any(o.split('@')[0] == output for o in outputs): return dep
+        raise KeyError(output)
+
+    def has(self, output):
+        try: self.dependency(output)
+        except KeyError: return False
+        return True
+
+    def payload(self, output, values, triggered=None):
+        dep = self.dependency(output)
+        def fill(items):
+            return [dict(id=i['id'], property=i['property'], value=values.get(f"{i['id']}.{i['property']}")) for i in items]
+        def split(o):
+            component, prop = o.split('@')[0].rsplit('.', 1)
+            return dict(id=component, property=prop)
+        out = dep['output']
+        outputs = [split(o) for o in out.strip('.').split('...')] if out.startswith('..') else split(out)
+        changed = triggered or [f"{i['id']}.{i['property']}" for i in dep['inputs']][:1]
+        return dict(output=out, outputs=outputs, inputs=fill(dep['inputs']), state=fill(dep['state']), changedPropIds=changed)
+
+    def call(self, output, values, triggered=None):
+        """
+        Runs the callback producing `output` with `values` ({'id.prop': value} for
+        its inputs and state). Returns ({'id.prop': value} of the outputs, seconds);
+        raises NoUpdate when there is no result to time (204).
+        """
+        payload = self.payload(output, values, triggered)
+        started = time.perf_counter()
+        status, body = self.request('_dash-update-component', payload)
+        if status == 200 and body and 'cacheKey' in body:
+            status, body = self._poll(payload, body, started)
+        elapsed = time.perf_counter() - started
+        if status == 204: raise NoUpdate(f"{output}: no update (HTTP 204)")
+        if status != 200 or not body or 'response' not in body: raise CallbackError(f"{output}: HTTP {status}")
+        flat = {f"{component}.{prop}": value for component, props in body['response'].items() for prop, value in props.items()}
+        return flat, elapsed
+
+    def _poll(self, payload, job, started):
+        query = urllib.parse.urlencode({'cacheKey': job['cacheKey'], 'job': job['job']})
+        while time.perf_counter() - started < self.timeout:
+            time.sleep(self.poll_interval)
+            status, body = self.request(f'_dash-update-component?{query}', payload)
+            # A running job answers with an empty or progress-only body; 204 means it ended without
+            # an update (another poller with the same inputs already took the result, or it was cancelled)
+            if status == 200 and body is not None and 'response' not in body: continue
+            return status, body
+        raise CallbackError(f"{payload['output']}: background callback timed out")
@@ -0,0 +1,181 @@
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import db_connection
+
+# ---------------------------------------------------------
+# SYNTHETIC DATASET GENERATOR
+# ---------------------------------------------------------
+# Fills the database at HR_DB_URL with a dashboard-shaped dataset: plants,
+# companies, departments, shifts, contractors, supervisors with teams, and
+# --days of swipes for every employee. Rows are generated inside Postgres
+# (generate_series), one month of swipes per transaction, so 1M employees and
+# years of history never pass through Python. The same --seed gives the same data.
+#
+#   python -m bench.generate --employees 10000 --days 365          # into an empty database
+#   python -m bench.generate --employees 100000 --days 730 --reset # wipes the tables first
+#
+# Only the columns the dashboard reads are created; run `python migrate.py`
+# afterwards (and `python rollup.py --full` etc. for the optional stores).
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS plant_plant (id serial PRIMARY KEY, location varchar, plant_code varchar);
+    CREATE TABLE IF NOT EXISTS plant_contractor (id serial PRIMARY KEY, contractor_name varchar);
+    CREATE TABLE IF NOT EXISTS hr_department (id serial PRIMARY KEY, name varchar);
+    CREATE TABLE IF NOT EXISTS hr_job (id serial PRIMARY KEY, name varchar);
+    CREATE TABLE IF NOT EXISTS resource_calendar (id serial PRIMARY KEY, name varchar, hours_per_day double precision,
+        active boolean DEFAULT true, company_id integer);
+    CREATE TABLE IF NOT EXISTS hr_employee (id serial PRIMARY KEY, name varchar, employee_code varchar, company_id integer,
+        plant_id integer, contractor_id integer, parent_id integer, active boolean DEFAULT true, department_id integer,
+        job_id integer, gender varchar, skills_status varchar, employee_type varchar, job_position varchar,
+        create_date timestamp DEFAULT now(), write_date timestamp DEFAULT now());
+    CREATE TABLE IF NOT EXISTS hr_attendance (id serial PRIMARY KEY, employee_id integer, check_in timestamp,
+        check_out timestamp, assigned_shift_id integer, write_date timestamp DEFAULT now())
+"""
+
+TABLES = ['hr_attendance', 'hr_employee', 'resource_calendar', 'hr_job', 'hr_department', 'plant_contractor', 'plant_plant']
+
+# Company ids 4 and 8 are the ones the dashboard labels (utils.COMPANY_LABELS)
+COMPANY_IDS = [4, 8, 9, 10]
+LOCATIONS = ['Pune', 'Chennai', 'Gurgaon', 'Manesar', 'Bawal', 'Sanand', 'Hosur', 'Dharuhera']
+DEPARTMENTS = ['Assembly', 'Paint', 'Stores', 'Welding', 'Machining', 'Quality', 'Maintenance', 'Logistics', 'Tool Room', 'Moulding']
+JOBS = ['Operator', 'Technician', 'Inspector', 'Helper', 'Fitter', 'Electrician']
+SKILLS = ['skilled', 'semi-skilled', 'unskilled', 'highly skilled']
+# (name, start hour, hours per day); the General shift is inactive for one company to exercise shift_active
+SHIFTS = [('General', 9, 8.5), ('A Shift', 6, 8.0), ('B Shift', 14, 8.0), ('C Shift', 22, 8.0)]
+
+EMPLOYEES_PER_SUPERVISOR = 25
+
+def _insert_reference(conn, args):
+    plants = args.plants
+    conn.execute(text("""
+        INSERT INTO plant_plant (id, location, plant_code)
+        SELECT g, (:locations)[1 + (g - 1) % cardinality(:locations)] || CASE WHEN g > cardinality(:locations) THEN ' ' || g ELSE '' END,
+               'P' || g
+        FROM generate_series(1, :n) g
+    """), {'n': plants, 'locations': LOCATIONS})
+    conn.execute(text("INSERT INTO plant_contractor (id, contractor_name) SELECT g, 'Contractor ' || g FROM generate_series(1, :n) g"), {'n': args.contractors})
+    conn.execute(text("""
+        INSERT INTO hr_department (id, name)
+        SELECT g, (:names)[1 + (g - 1) % cardinality(:names)] || CASE WHEN g > cardinality(:names) THEN ' ' || g ELSE '' END
+        FROM generate_series(1, :n) g
+    """), {'n': args.departments, 'names': DEPARTMENTS})
+    conn.execute(text("INSERT INTO hr_job (id, name) SELECT g, (:names)[g] FROM generate_series(1, cardinality(:names)) g"), {'names': JOBS})
+    companies = COMPANY_IDS[:args.companies]
+    shifts = [(i * len(SHIFTS) + j + 1, name, hours, company, not (name == 'General' and i == len(companies) - 1 and i > 0))
+              for i, company in enumerate(companies) for j, (name, _, hours) in enumerate(SHIFTS)]
+    for shift_id, name, hours, company, active in shifts:
+        conn.execute(text("INSERT INTO resource_calendar (id, name, hours_per_day, active, company_id) VALUES (:id, :name, :hours, :active, :company)"),
+                     {'id': shift_id, 'name': name, 'hours': hours, 'active': active, 'company': company})
+    return companies
+
+def _insert_employees(conn, args, companies):
+    # Employees 1..S are supervisors (no parent, always active); everyone else reports to
+    # one of them and works in their plant. A plant belongs to one company; ~40% of the
+    # workforce comes through contractors.
+    supervisors = max(1, args.employees // EMPLOYEES_PER_SUPERVISOR)
+    conn.execute(text("SELECT setseed(:seed)"), {'seed': args.seed})
+    conn.execute(text("""
+        INSERT INTO hr_employee (id, name, employee_code, company_id, plant_id, contractor_id, parent_id, active, department_id,
+                                 job_id, gender, skills_status, employee_type, job_position, create_date)
+        SELECT g, 'Employee ' || g, 'E' || lpad(g::text, 7, '0'),
+            (:companies)[1 + (plant - 1) % cardinality(:companies)], plant,
+            CASE WHEN contract THEN 1 + (random() * (:contractors - 1))::int END,
+            parent,
+            parent IS NULL OR random() > 0.03,
+            CASE WHEN random() > 0.02 THEN 1 + (random() * (:departments - 1))::int END,
+            1 + (random() * (cardinality(:jobs) - 1))::int,
+            CASE WHEN random() < 0.8 THEN 'male' WHEN random() < 0.97 THEN 'female' END,
+            CASE WHEN random() > 0.05 THEN (:skills)[1 + (random() * (cardinality(:skills) - 1))::int] END,
+            CASE WHEN contract THEN 'contractor' ELSE 'employee' END,
+            CASE WHEN random() > 0.04 THEN 'Position ' || (1 + g % 50) END,
+            :start - make_interval(days => (random() * 1500)::int)
+        FROM (
+            SELECT g, parent, 1 + (COALESCE(parent, g) % :plants) AS plant, parent IS NOT NULL AND random() < 0.4 AS contract
+            FROM (SELECT g, CASE WHEN g > :supervisors THEN 1 + (g % :supervisors) END AS parent FROM generate_series(1, :n) g) t
+        ) s
+    """), {'n': args.employees, 'supervisors': supervisors, 'companies': companies, 'plants': args.plants,
+           'contractors': args.contractors, 'departments': args.departments, 'jobs': JOBS, 'skills': SKILLS, 'start': args.start})
+
+def _insert_month(conn, first, last, args):
+    # Each employee keeps one shift of their company. Presence ~92% on working days and
+    # ~25% on Sundays; ~2% of sessions miss their check-out, ~3% of days carry a second
+    # short session (multiple check-ins); worked time scatters around the shift length.
+    params = {'first': first, 'last': last, 'shifts': len(SHIFTS), 'starts': [start for _, start, _ in SHIFTS],
+              'hours': [hours for _, _, hours in SHIFTS], 'companies': COMPANY_IDS[:args.companies]}
+    conn.execute(text("SELECT setseed(:s)"), {'s': ((args.seed * 1000003 + first.toordinal()) % 2000000) / 1000000.0 - 1})
+    conn.execute(text("""
+        INSERT INTO hr_attendance (employee_id, check_in, check_out, assigned_shift_id, write_date)
+        SELECT s.id, s.check_in,
+            CASE WHEN random() > 0.02 THEN s.check_in + make_interval(mins => ((s.hours + random() * 3 - 1) * 60)::int) END,
+            s.shift_id, s.check_in + interval '1 hour'
+        FROM (
+            SELECT e.id, sh.slot, sh.slot + (array_position(:companies, e.company_id) - 1) * :shifts AS shift_id,
+                d + make_interval(hours => (:starts)[sh.slot], mins => (random() * 50 - 20)::int) AS check_in,
+                (:hours)[sh.slot] AS hours
+            FROM generate_series(CAST(:first AS date), CAST(:last AS date), interval '1 day') d
+            CROSS JOIN hr_employee e
+            CROSS JOIN LATERAL (SELECT 1 + abs(hashint4(e.id)) % :shifts AS slot) sh
+            WHERE random() < CASE WHEN extract(dow FROM d) = 0 THEN 0.25 ELSE 0.92 END
+        ) s
+    """), params)
+    conn.execute(text("""
+        INSERT INTO hr_attendance (employee_id, check_in, check_out, assigned_shift_id, write_date)
+        SELECT a.employee_id, a.check_out + interval '30 minutes', a.check_out + interval '2 hours', a.assigned_shift_id, a.write_date
+        FROM hr_attendance a
+        WHERE a.check_in >= :first AND a.check_in < CAST(:last AS date) + 1 AND a.check_out IS NOT NULL AND random() < 0.03
+    """), params)
+
+def generate(args):
+    with db_connection.begin() as conn:
+        conn.execute(text("SET LOCAL statement_timeout = 0"))
+        for stmt in SCHEMA.split(';'): conn.execute(text(stmt))
+        if args.reset:
+            conn.execute(text(f"TRUNCATE {', '.join(TABLES)}"))
+        elif conn.execute(text("SELECT EXISTS (SELECT 1 FROM hr_employee)")).scalar():
+            sys.exit("hr_employee is not empty; pass --reset to replace its data (never point this at production).")
+        companies = _insert_reference(conn, args)
+        _insert_employees(conn, args, companies)
+    print(f"{args.employees:,} employees in {args.plants} plants, {len(companies)} companies.")
+
+    day, end, total = args.start, args.start + timedelta(days=args.days - 1), 0
+    while day <= end:
+        last = min(end, (day.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1))
+        started = time.perf_counter()
+        with db_connection.begin() as conn:
+            conn.execute(text("SET LOCAL statement_timeout = 0"))
+            _insert_month(conn, day, last, args)
+            rows = conn.execute(text("SELECT COUNT(*) FROM hr_attendance WHERE check_in >= :a AND check_in < CAST(:b AS date) + 1"), {'a': day, 'b': last}).scalar()
+        total += rows
+        print(f"{day:%Y-%m}: {rows:,} swipes in {time.perf_counter() - started:.1f}s")
+        day = last + timedelta(days=1)
+
+    with db_connection.begin() as conn:
+        for table in TABLES: conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), GREATEST((SELECT MAX(id) FROM {table}), 1))"))
+    with db_connection.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("SET statement_timeout = 0"))
+        conn.execute(text(f"VACUUM ANALYZE {', '.join(TABLES)}"))
+    print(f"Generated {total:,} attendance rows. Run `python migrate.py` next.")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fill the dashboard database with synthetic HR attendance data.")
+    parser.add_argument('--employees', type=int, default=10000)
+    parser.add_argument('--days', type=int, default=365, help="days of swipes, ending yesterday unless --start is given")
+    parser.add_argument('--start', type=date.fromisoformat, default=None, help="first day of swipes (YYYY-MM-DD)")
+    parser.add_argument('--plants', type=int, default=4)
+    parser.add_argument('--companies', type=int, default=2, choices=range(1, len(COMPANY_IDS) + 1))
+    parser.add_argument('--departments', type=int, default=12)
+    parser.add_argument('--contractors', type=int, default=30)
+    parser.add_argument('--seed', type=float, default=0.42, help="random seed in [-1, 1]")
+    parser.add_argument('--reset', action='store_true', help="truncate the dashboard tables first")
+    args = parser.parse_args(argv)
+    if args.start is None: args.start = date.today() - timedelta(days=args.days)
+    return args
+
+if __name__ == '__main__':
+    generate(parse_args())
@@ -0,0 +1,284 @@
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import utils
+from bench.client import DashClient, NoUpdate
+from bench.run import STEPS, percentile
+
+# ---------------------------------------------------------
+# CONCURRENT-USER LOAD TEST
+# ---------------------------------------------------------
+# Simulated supervisors replay realistic sessions against the app through
+# /_dash-update-component: log in with ?empid=, load the Attendance page, change
+# the date, click a day (drill-down, sometimes cross-filtered), switch to Man Days
+# and Data Quality, with think time in between. A page's callbacks are fired
+# together, as the browser does. Each --users level runs for --duration seconds
+# and reports throughput and per-callback latency percentiles, so the level where
+# p95 degrades is visible in one run.
+#
+# The app is always driven over HTTP: without --url a gunicorn server is started
+# from gunicorn.conf.py (HR_WEB_WORKERS etc. apply) and stopped afterwards. The
+# app must not be hosted in this process: its background callbacks fork, and a
+# fork taken while another thread holds a lock hangs the job. Users are spread
+# over --client-processes processes so the client's GIL is not what saturates.
+#
+#   python -m bench.loadtest --users 5,10,20,40 --duration 60                  # local gunicorn
+#   python -m bench.loadtest --url http://localhost:8050 --users 50 --empids 12 40
+
+SERVER_START_TIMEOUT_SECONDS = 120
+
+# Browsers open at most this many connections per host
+BROWSER_CONNECTIONS = 6
+
+# Page loads: the page layout callback, then everything that fires once the page is shown
+PAGE_STEPS = {
+    '/': ['update_attendance_widget', 'update_supervisor_kpi', 'update_weekly_graph', 'update_crossfilter_facts',
+          'update_department_figure', 'update_gender_skills_figures', 'update_shift_figure'],
+    '/mandays': ['update_mandays_widget', 'update_md_supervisor_kpi', 'update_table:day'],
+    '/anomaly': ['update_attendance_tables', 'update_master_tables'],
+}
+
+LOAD_STEPS = dict(STEPS, **{
+    'display_page': ('_pages_content.children', lambda ctx: {'_pages_location.pathname': ctx['path'], '_pages_location.search': f"?empid={ctx['empid']}"}, None),
+    'unified_drilldown': ('details-offcanvas.is_open', lambda ctx: {
+        'weekly-attendance-graph.clickData': {'points': [{'x': ctx['date']}]}, 'att-date.date': ctx['date'],
+        'interaction-store.data': ctx.get('interaction') or {}, 'user-context-store.data': ctx['user']}, ['weekly-attendance-graph.clickData']),
+})
+
+class Stats:
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        # 204s: answered without a result, so neither a latency sample nor an error
+        self.no_updates = {}
+        self.sessions = 0
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds, error=False):
+        with self._lock:
+            if error: self.errors[name] = self.errors.get(name, 0) + 1
+            else: self.latencies.setdefault(name, []).append(seconds)
+
+    def no_update(self, name):
+        with self._lock: self.no_updates[name] = self.no_updates.get(name, 0) + 1
+
+    def session_done(self):
+        with self._lock: self.sessions += 1
+
+    def state(self):
+        with self._lock: return self.latencies, self.errors, self.no_updates, self.sessions
+
+    def merge(self, state):
+        """Adds another process' `state()`."""
+        latencies, errors, no_updates, sessions = state
+        with self._lock:
+            for name, values in latencies.items(): self.latencies.setdefault(name, []).extend(values)
+            for counts, more in ((self.errors, errors), (self.no_updates, no_updates)):
+                for name, n in more.items(): counts[name] = counts.get(name, 0) + n
+            self.sessions += sessions
+
+    def report(self, elapsed):
+        with self._lock:
+            steps = {}
+            for name in sorted(set(self.latencies) | set(self.errors) | set(self.no_updates)):
+                values = self.latencies.get(name, [])
+                steps[name] = {'calls': len(values), 'errors': self.errors.get(name, 0), 'no_update': self.no_updates.get(name, 0),
+                               'per_second': round(len(values) / elapsed, 2)}
+                if values:
+                    steps[name].update({f"p{q}_ms": round(percentile(values, q) * 1000, 1) for q in (50, 90, 95, 99)},
+                                       max_ms=round(max(values) * 1000, 1))
+            everything = [v for values in self.latencies.values() for v in values]
+            total = {'sessions': self.sessions, 'calls': len(everything), 'errors': sum(self.errors.values()),
+                     'no_update': sum(self.no_updates.values()), 'calls_per_second': round(len(everything) / elapsed, 2)}
+            if everything: total.update({f"p{q}_ms": round(percentile(everything, q) * 1000, 1) for q in (50, 95, 99)})
+            return {'total': total, 'steps': steps}
+
+class VirtualUser(threading.Thread):
+    """One supervisor clicking through sessions until `stop_at`."""
+    def __init__(self, client, empid, days, stats, stop_at, think_time, seed, skipped=()):
+        super().__init__(daemon=True)
+        self.client, self.empid, self.days, self.stats = client, empid, days, stats
+        self.skipped = set(skipped)
+        self.stop_at, self.think_time = stop_at, think_time
+        self.rng = random.Random(seed)
+        self.pool = ThreadPoolExecutor(max_workers=BROWSER_CONNECTIONS)
+
+    def fire(self, ctx, names):
+        """Fires `names` together; returns once all have answered. False when the test is over."""
+        def one(name):
+            output, values, triggered = LOAD_STEPS[name]
+            started = time.perf_counter()
+            try: outputs, seconds = self.client.call(output, values(ctx), triggered)
+            except NoUpdate:
+                self.stats.no_update(name)
+                return {}
+            except Exception:
+                self.stats.record(name, time.perf_counter() - started, error=True)
+                return {}
+            self.stats.record(name, seconds)
+            return outputs
+        for outputs in self.pool.map(one, [name for name in names if name not in self.skipped]): ctx.update(outputs)
+        return time.time() < self.stop_at
+
+    def think(self):
+        time.sleep(min(self.rng.expovariate(1 / self.think_time), 5 * self.think_time) if self.think_time else 0)
+        return time.time() < self.stop_at
+
+    def visit(self, ctx, path):
+        ctx['path'] = path
+        return self.fire(ctx, ['display_page']) and self.fire(ctx, PAGE_STEPS[path])
+
+    def session(self):
+        ctx = {'empid': self.empid, 'date': self.days[0], 'path': '/'}
+        ctx['start'], ctx['end'] = (date.fromisoformat(self.days[0]) - timedelta(days=29)).isoformat(), self.days[0]
+        if not self.fire(ctx, ['handle_login']): return
+        ctx['user'] = ctx.get('user-context-store.data')
+        if not ctx['user'] or not ctx['user'].get('empid'): return
+
+        if not (self.visit(ctx, '/') and self.think()): return
+        # Look at another recent day, then drill into it (cross-filtered by a department half the time)
+        ctx['date'] = self.rng.choice(self.days)
+        if not (self.fire(ctx, PAGE_STEPS['/'][:4]) and self.think()): return
+        facts = ctx.get('crossfilter-facts-store.data') or {}
+        departments = (facts.get('dept_name') or {}).get('labels') or []
+        ctx['interaction'] = {'col': 'dept_name', 'val': self.rng.choice(departments), 'source': 'department-bar-graph'} \
+            if departments and self.rng.random() < 0.5 else {}
+        ctx.pop('drilldown-store.data', None)
+        if not (self.fire(ctx, ['unified_drilldown']) and self.fire(ctx, ['update_drilldown_page']) and self.think()): return
+
+        if not (self.visit(ctx, '/mandays') and self.think()): return
+        if self.rng.random() < 0.3 and not (self.fire(ctx, ['update_table:mtd']) and self.think()): return
+        if not (self.visit(ctx, '/anomaly') and self.think()): return
+        self.stats.session_done()
+
+    def run(self):
+        try:
+            while time.time() < self.stop_at: self.session()
+        finally:
+            self.pool.shutdown(wait=False)
+
+def active_supervisors(limit):
+    df = utils.read_sql("""
+        SELECT e.parent_id AS empid FROM hr_employee e JOIN hr_employee s ON s.id = e.parent_id AND s.active
+        GROUP BY e.parent_id ORDER BY COUNT(*) DESC, e.parent_id LIMIT :limit
+    """, {'limit': limit}, cache=False)
+    return [str(int(v)) for v in df['empid']]
+
+def recent_days(count):
+    last = utils.read_sql("SELECT MAX(check_in)::date AS day FROM hr_attendance", cache=False)['day'].iloc[0]
+    last = date.fromisoformat(str(last)) if last is not None else date.today()
+    return [(last - timedelta(days=i)).isoformat() for i in range(count)]
+
+def run_clients(url, timeout, users, days, stop_at, think_time, skipped):
+    """One client process: runs `users` ((start time, empid, seed) each) as threads; returns its Stats.state()."""
+    client = DashClient(base_url=url, timeout=timeout)
+    stats = Stats()
+    crowd = []
+    for start_at, empid, seed in users:
+        time.sleep(max(0, start_at - time.time()))
+        user = VirtualUser(client, empid, days, stats, stop_at, think_time, seed=seed, skipped=skipped)
+        user.start()
+        crowd.append(user)
+    for user in crowd: user.join(timeout=max(0, stop_at - time.time()) + timeout)
+    return stats.state()
+
+def run_level(url, users, args, empids, days, skipped=()):
+    stats = Stats()
+    started = time.time()
+    stop_at = started + args.ramp_up + args.duration
+    schedule = [(started + i * args.ramp_up / users, empids[i % len(empids)], args.seed + i) for i in range(users)]
+    processes = max(1, min(users, args.client_processes))
+    # Spawned, not forked: this process holds database connections
+    with ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context('spawn')) as pool:
+        futures = [pool.submit(run_clients, url, args.timeout, schedule[i::processes], days, stop_at, args.think_time, skipped)
+                   for i in range(processes)]
+        for future in futures: stats.merge(future.result())
+    return stats.report(time.time() - started)
+
+@contextlib.contextmanager
+def local_server():
+    """Base URL of a gunicorn server (gunicorn.conf.py) on a free local port, stopped on exit."""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:server'], cwd=root,
+                              env=dict(os.environ, HR_BIND=f"127.0.0.1:{port}"), stdout=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.time() + SERVER_START_TIMEOUT_SECONDS
+        while True:
+            if server.poll() is not None: sys.exit(f"gunicorn exited with status {server.returncode}")
+            try:
+                with urllib.request.urlopen(url + '/_dash-dependencies', timeout=5): break
+            except OSError:
+                if time.time() > deadline: sys.exit(f"gunicorn did not answer on {url}")
+                time.sleep(0.5)
+        yield url
+    finally:
+        server.terminate()
+        try: server.wait(timeout=60)
+        except subprocess.TimeoutExpired: server.kill()
+
+def print_level(users, report):
+    total = report['total']
+    print(f"\n=== {users} users: {total['calls_per_second']} callbacks/s, {total['sessions']} sessions, {total['errors']} errors, "
+          f"{total['no_update']} without update, p50 {total.get('p50_ms', '-')} ms, p95 {total.get('p95_ms', '-')} ms")
+    print(f"{'callback':32} {'calls':>7} {'err':>5} {'204':>5} {'/s':>7} {'p50':>8} {'p90':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    for name, s in report['steps'].items():
+        cells = [f"{s.get(k, '-'):>8}" for k in ('p50_ms', 'p90_ms', 'p95_ms', 'p99_ms', 'max_ms')]
+        print(f"{name:32} {s['calls']:7} {s['errors']:5} {s['no_update']:5} {s['per_second']:7} {' '.join(cells)}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Replay concurrent supervisor sessions against the dashboard.")
+    parser.add_argument('--url', help="base URL of a running instance (default: start gunicorn locally)")
+    parser.add_argument('--users', default='10', help="concurrent users, or a comma-separated list of levels")
+    parser.add_argument('--duration', type=float, default=60, help="seconds per level after ramp-up")
+    parser.add_argument('--ramp-up', type=float, default=5, help="seconds over which users join")
+    parser.add_argument('--think-time', type=float, default=2, help="mean pause between actions (exponential)")
+    parser.add_argument('--empids', nargs='*', help="supervisors to log in as (default: active supervisors from HR_DB_URL)")
+    parser.add_argument('--days', type=int, default=14, help="recent days users pick from")
+    parser.add_argument('--timeout', type=float, default=30, help="seconds before a callback counts as failed")
+    parser.add_argument('--client-processes', type=int, default=os.cpu_count() or 1, help="processes the users are spread over")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="write the per-level reports as JSON")
+    return parser.parse_args(argv)
+
+def main(args, url):
+    levels = [int(n) for n in args.users.split(',')]
+    client = DashClient(base_url=url, timeout=args.timeout)
+    # Steps without a registered callback (e.g. the server-side figures while the cross-filter
+    # runs client-side) are left out of every session and listed in the report
+    skipped = [name for name, (output, _, _) in LOAD_STEPS.items() if not client.has(output)]
+    for name in skipped: print(f"{name:32} SKIPPED: no callback produces {LOAD_STEPS[name][0]}", file=sys.stderr)
+    if {'handle_login', 'display_page'} & set(skipped): sys.exit("Cannot log in or open pages without these callbacks.")
+    empids = args.empids or active_supervisors(max(levels))
+    if not empids: sys.exit("No supervisors to log in as; pass --empids.")
+    days = recent_days(args.days)
+
+    reports = {}
+    for users in levels:
+        reports[users] = run_level(url, users, args, empids, days, skipped)
+        print_level(users, reports[users])
+    if args.output:
+        meta = {'timestamp': datetime.now().isoformat(timespec='seconds'), 'url': args.url, 'duration': args.duration,
+                'think_time': args.think_time, 'empids': len(empids), 'skipped': skipped}
+        with open(args.output, 'w') as f: json.dump({'meta': meta, 'levels': reports}, f, indent=2)
+
+if __name__ == '__main__':
+    args = parse_args()
+    with (contextlib.nullcontext(args.url) if args.url else local_server()) as url:
+        main(args, url)
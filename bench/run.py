@@ -0,0 +1,165 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pandas as pd
+import utils
+import kpi
+from bench.client import DashClient, NoUpdate
+
+# ---------------------------------------------------------
+# CALLBACK BENCHMARK SUITE
+# ---------------------------------------------------------
+# Times every page callback through the real Dash request path (in-process
+# Flask test client; background callbacks include their worker process and
+# polling) against the database at HR_DB_URL, e.g. one filled by bench.generate.
+# Each step runs once cold (result cache, KPI memo and background-callback cache
+# cleared) and then --repeat times warm. Results are written as JSON keyed by
+# step name so two runs can be diffed with --compare.
+#
+#   python -m bench.run --output before.json
+#   python -m bench.run --output after.json --compare before.json
+
+# Background callbacks are polled this often, so their timings resolve to ~10 ms
+BENCH_POLL_INTERVAL_SECONDS = 0.01
+
+# Step name (the callback function, with a variant suffix) -> (output, inputs & state, changed prop)
+# `ctx` holds 'user', 'date', 'start', 'end' and the outputs of earlier steps.
+STEPS = {
+    'handle_login': ('user-context-store.data', lambda ctx: {'url.search': f"?empid={ctx['empid']}"}, None),
+    'update_attendance_widget': ('att-status-widget.children', lambda ctx: {'user-context-store.data': ctx['user'], 'att-date.date': ctx['date']}, None),
+    'update_supervisor_kpi': ('kpi-supervisor-count.children', lambda ctx: {'att-date.date': ctx['date'], 'user-context-store.data': ctx['user']}, None),
+    'update_weekly_graph': ('weekly-attendance-graph.figure', lambda ctx: {'att-date.date': ctx['date'], 'user-context-store.data': ctx['user']}, None),
+    'update_crossfilter_facts': ('crossfilter-facts-store.data', lambda ctx: {'att-date.date': ctx['date'], 'user-context-store.data': ctx['user']}, ['att-date.date']),
+    'update_department_figure': ('department-bar-graph.figure', lambda ctx: {'att-date.date': ctx['date'], 'interaction-store.data': {}, 'user-context-store.data': ctx['user']}, ['att-date.date']),
+    'update_gender_skills_figures': ('gender-bar-graph.figure', lambda ctx: {'att-date.date': ctx['date'], 'interaction-store.data': {}, 'user-context-store.data': ctx['user']}, ['att-date.date']),
+    'update_shift_figure': ('shift-bar-graph.figure', lambda ctx: {'att-date.date': ctx['date'], 'interaction-store.data': {}, 'user-context-store.data': ctx['user']}, ['att-date.date']),
+    'unified_drilldown': ('details-offcanvas.is_open', lambda ctx: {
+        'weekly-attendance-graph.clickData': {'points': [{'x': ctx['date']}]}, 'att-date.date': ctx['date'],
+        'interaction-store.data': {}, 'user-context-store.data': ctx['user']}, ['weekly-attendance-graph.clickData']),
+    'update_drilldown_page': ('drilldown-table.data', lambda ctx: {
+        'drilldown-store.data': ctx.get('drilldown-store.data') or {'date': ctx['date'], 'filter': None}, 'drilldown-table.page_current': 0,
+        'drilldown-table.sort_by': [], 'drilldown-table.filter_query': '', 'drilldown-table.page_size': 50,
+        'drilldown-cursors.data': {}, 'user-context-store.data': ctx['user']}, None),
+    'update_mandays_widget': ('md-status-widget.children', lambda ctx: {'user-context-store.data': ctx['user'], 'md-date.date': ctx['date'], 'md-view.value': 'day'}, None),
+    'update_md_supervisor_kpi': ('md-kpi-supervisor-count.children', lambda ctx: {'md-date.date': ctx['date'], 'user-context-store.data': ctx['user']}, None),
+    'update_table:day': ('mandays-table-container.children', lambda ctx: {'md-date.date': ctx['date'], 'user-context-store.data': ctx['user'], 'md-view.value': 'day'}, None),
+    'update_table:mtd': ('mandays-table-container.children', lambda ctx: {'md-date.date': ctx['date'], 'user-context-store.data': ctx['user'], 'md-view.value': 'mtd'}, None),
+    'update_table:month': ('mandays-table-container.children', lambda ctx: {'md-date.date': ctx['date'], 'user-context-store.data': ctx['user'], 'md-view.value': 'month'}, None),
+    'update_attendance_tables': ('tbl-missed.children', lambda ctx: {'anomaly-date.date': ctx['date'], 'user-context-store.data': ctx['user']}, None),
+    'update_range_summary': ('anomaly-range-summary.data', lambda ctx: {
+        'anomaly-mode.value': 'range', 'anomaly-range.start_date': ctx['start'], 'anomaly-range.end_date': ctx['end'],
+        'user-context-store.data': ctx['user']}, None),
+    'update_range_missed': ('anomaly-range-missed.data', lambda ctx: {
+        'anomaly-range-summary.data': ctx.get('anomaly-range-summary.data'), 'anomaly-range-missed.page_current': 0,
+        'anomaly-range-missed.page_size': 50, 'anomaly-range-missed-cursors.data': {}, 'user-context-store.data': ctx['user']}, None),
+    'update_master_tables': ('tbl-skills.children', lambda ctx: {'user-context-store.data': ctx['user']}, None),
+}
+
+def run_step(client, name, ctx):
+    """Fires step `name`; returns (seconds, response bytes) and records its outputs in ctx."""
+    output, values, triggered = STEPS[name]
+    outputs, seconds = client.call(output, values(ctx), triggered)
+    ctx.update(outputs)
+    return seconds, len(json.dumps(outputs, default=str))
+
+def clear_caches(background_callback_manager):
+    utils.result_cache.clear()
+    with kpi._daily_counts_lock: kpi._daily_counts.clear()
+    background_callback_manager.handle.clear()
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered) + 0.5)) - 1))]
+
+def default_context(args):
+    scale = utils.read_sql("""
+        SELECT (SELECT COUNT(*) FROM hr_employee) AS employees, (SELECT COUNT(*) FROM hr_attendance) AS attendance,
+               (SELECT MAX(check_in)::date FROM hr_attendance) AS last_day,
+               (SELECT e.parent_id FROM hr_employee e JOIN hr_employee s ON s.id = e.parent_id AND s.active
+                GROUP BY e.parent_id ORDER BY COUNT(*) DESC, e.parent_id LIMIT 1) AS supervisor
+    """, cache=False).iloc[0]
+    day = args.date or (pd.Timestamp(scale['last_day']).date() if pd.notna(scale['last_day']) else date.today())
+    empid = args.empid or (str(int(scale['supervisor'])) if pd.notna(scale['supervisor']) else '1')
+    ctx = {'empid': empid, 'date': day.isoformat(), 'start': (day - timedelta(days=29)).isoformat(), 'end': day.isoformat()}
+    return ctx, {'employees': int(scale['employees']), 'attendance_rows': int(scale['attendance'])}
+
+def git_commit():
+    try: return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, cwd=os.path.dirname(__file__)).stdout.strip() or None
+    except OSError: return None
+
+def benchmark(args):
+    import app as dash_app
+    client = DashClient(dash_app.server, poll_interval=BENCH_POLL_INTERVAL_SECONDS)
+    ctx, scale = default_context(args)
+    selected = [name for name in STEPS if not args.only or any(s in name for s in args.only)]
+    steps = [name for name in selected if client.has(STEPS[name][0])]
+    # Steps whose callback is not registered (renamed output, page removed) are listed, not dropped silently
+    skipped = [name for name in selected if name not in steps]
+    for name in skipped: print(f"{name:32} SKIPPED: no callback produces {STEPS[name][0]}", file=sys.stderr)
+    if not steps: sys.exit("None of the selected steps has a registered callback.")
+
+    run_step(client, 'handle_login', ctx)
+    ctx['user'] = ctx.get('user-context-store.data')
+    if not ctx['user'] or not ctx['user'].get('empid'): sys.exit(f"empid {ctx['empid']} did not log in (unknown or inactive).")
+
+    results = {}
+    for name in steps:
+        clear_caches(dash_app.background_callback_manager)
+        try:
+            cold, nbytes = run_step(client, name, ctx)
+            warm = [run_step(client, name, ctx)[0] for _ in range(args.repeat)]
+        except NoUpdate:
+            # Nothing to time; listed so the step does not look fast
+            results[name] = {'no_update': True}
+            print(f"{name:32} no update (HTTP 204)")
+            continue
+        results[name] = {'cold_ms': round(cold * 1000, 2), 'warm_p50_ms': round(percentile(warm, 50) * 1000, 2),
+                         'warm_p95_ms': round(percentile(warm, 95) * 1000, 2), 'warm_min_ms': round(min(warm) * 1000, 2),
+                         'warm_max_ms': round(max(warm) * 1000, 2), 'runs': len(warm), 'response_bytes': nbytes}
+        print(f"{name:32} cold {results[name]['cold_ms']:9.1f} ms   warm p50 {results[name]['warm_p50_ms']:9.1f} ms   p95 {results[name]['warm_p95_ms']:9.1f} ms")
+
+    meta = {'timestamp': datetime.now().isoformat(timespec='seconds'), 'commit': git_commit(), 'python': platform.python_version(),
+            'date': ctx['date'], 'empid': ctx['empid'], **scale, 'skipped': skipped,
+            'flags': {name: getattr(utils, name) for name in ('USE_ATTENDANCE_ROLLUP', 'USE_ANOMALY_STORE', 'USE_MANDAYS_LEDGER',
+                                                                'USE_PREPARED_STATEMENTS', 'MANDAYS_ENGINE')}}
+    return {'meta': meta, 'results': results}
+
+def compare(current, baseline, metric='warm_p50_ms'):
+    """Prints per-step ratios against `baseline`; returns the worst ratio."""
+    worst = 0.0
+    print(f"\n{'step':32} {'baseline':>10} {'current':>10} {'ratio':>7}   ({metric})")
+    for name, result in current['results'].items():
+        before = baseline['results'].get(name, {}).get(metric)
+        if not before or metric not in result: continue
+        ratio = result[metric] / before
+        worst = max(worst, ratio)
+        print(f"{name:32} {before:10.1f} {result[metric]:10.1f} {ratio:7.2f}")
+    for name in baseline['results']:
+        if name not in current['results']: print(f"{name:32} {'':>10} {'missing':>10}")
+    return worst
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard's page callbacks.")
+    parser.add_argument('--empid', help="supervisor to log in as (default: the one with the largest team)")
+    parser.add_argument('--date', type=date.fromisoformat, help="selected day (default: the latest day with swipes)")
+    parser.add_argument('--repeat', type=int, default=5, help="warm runs per step")
+    parser.add_argument('--only', nargs='*', help="only steps whose name contains one of these")
+    parser.add_argument('--output', help="write the results JSON here")
+    parser.add_argument('--compare', help="baseline results JSON to compare warm p50s against")
+    parser.add_argument('--fail-above', type=float, help="exit 1 when a step's warm p50 exceeds the baseline by this ratio")
+    return parser.parse_args(argv)
+
+if __name__ == '__main__':
+    args = parse_args()
+    report = benchmark(args)
+    if args.output:
+        with open(args.output, 'w') as f: json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f: worst = compare(report, json.load(f))
+        if args.fail_above and worst > args.fail_above: sys.exit(1)
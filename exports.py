@@ -0,0 +1,133 @@
+import zlib
+import urllib.parse
+import dash
+import pandas as pd
+from flask import Response, abort, request, stream_with_context
+from utils import (read_sql, stream_sql, resolve_user_context, format_drilldown, mandays_filters, mandays_per_employee, summarize_mandays,
+                   read_mandays_summary, read_mandays_ledger, mandays_view_range, MANDAYS_ENGINE, MANDAYS_GROUP)
+from queries import DRILLDOWN, DRILLDOWN_COUNT, DRILLDOWN_COLUMNS, drilldown_filters, drilldown_order
+from reports import write_table_pdf
+
+# ---------------------------------------------------------
+# STREAMING CSV EXPORTS
+# ---------------------------------------------------------
+# Export buttons link here instead of round-tripping page data through dcc.Download.
+# Each request re-runs its query through a named server-side cursor and streams
+# the CSV EXPORT_CHUNK_ROWS rows at a time (gzip with ?gzip=1), so a month of
+# plant-wide swipes exports in bounded memory. The scope always comes from
+# ?empid=, resolved the same way as the login callback.
+
+EXPORT_CHUNK_ROWS = 5000
+
+def export_url(name, user_data, **args):
+    """Relative link to the `name` export for the logged-in user; None-valued args are dropped."""
+    args = {'empid': user_data.get('empid'), **args}
+    query = urllib.parse.urlencode({k: v for k, v in args.items() if v not in (None, '')})
+    return dash.get_relative_path(f"/export/{name}.csv?{query}")
+
+def _user_data():
+    empid = request.args.get('empid')
+    try: user_data = resolve_user_context(empid) if empid else None
+    except (TypeError, ValueError): user_data = None
+    if not user_data: abort(403)
+    return user_data
+
+def _csv_chunks(frames, columns, numbered=True):
+    # S.No keeps counting across chunks; the header is written even when there are no rows
+    written = 0
+    for df in frames:
+        if numbered: df.insert(0, "S.No", range(written + 1, written + 1 + len(df)))
+        yield df.to_csv(index=False, header=written == 0)
+        written += len(df)
+    if written == 0: yield pd.DataFrame(columns=(["S.No"] if numbered else []) + columns).to_csv(index=False)
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data: yield data
+    yield compressor.flush()
+
+def _csv_response(chunks, filename):
+    if request.args.get('gzip') == '1':
+        body, mimetype, filename = _gzip(chunks), 'application/gzip', filename + '.gz'
+    else:
+        body, mimetype = (chunk.encode('utf-8') for chunk in chunks), 'text/csv'
+    return Response(stream_with_context(body), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+def attendance_frames(spec, user_data, sort_by=None, filter_query=None):
+    """Formatted drill-down rows for a drilldown-store spec, in the grid's sort, chunk by chunk."""
+    keys, descending = drilldown_order(sort_by)
+    order = ", ".join(f"{key} {'DESC' if descending else 'ASC'}" for key in keys)
+    return (format_drilldown(df) for df in stream_sql(DRILLDOWN, where=drilldown_filters(spec, user_data, filter_query),
+                                                       keys='', order=order, page='', chunk_rows=EXPORT_CHUNK_ROWS))
+
+def mandays_summary(user_data, start_date=None, end_date=None, progress=None):
+    """Man-days summary (aggregated by the database, or folded chunk by chunk from the raw rows); None when there are none."""
+    if MANDAYS_ENGINE == 'sql': return read_mandays_summary(user_data, start_date, end_date)
+    statement, filters = mandays_filters(user_data, start_date, end_date)
+
+    # Each chunk is folded into per-(group, employee) sums, so memory follows headcount, not swipes
+    per_employee, rows = None, 0
+    for df in stream_sql(statement, where=filters, chunk_rows=EXPORT_CHUNK_ROWS):
+        partial = mandays_per_employee(df)
+        if per_employee is not None:
+            partial = pd.concat([per_employee, partial]).groupby(MANDAYS_GROUP + ['emp_id'], as_index=False).sum()
+        per_employee, rows = partial, rows + len(df)
+        if progress: progress(rows)
+    return summarize_mandays(per_employee) if per_employee is not None else None
+
+def mandays_report(user_data, selected_date=None, view='day', progress=None):
+    """Man Days page table for a view (see utils.MANDAYS_VIEWS); None when there are no rows."""
+    if view in ('mtd', 'month') and selected_date:
+        return read_mandays_ledger(user_data, *mandays_view_range(selected_date, view))
+    return mandays_summary(user_data, selected_date, progress=progress)
+
+def export_attendance():
+    """?date=[&end=][&col=&val=][&sort=&dir=][&filter=] - attendance drill-down rows."""
+    user_data = _user_data()
+    if not request.args.get('date'): abort(400)
+    args = request.args
+    cross_filter = {'col': args['col'], 'val': args.get('val', '')} if args.get('col') else None
+    spec = {'date': args['date'], 'end': args.get('end'), 'filter': cross_filter}
+    sort_by = [{'column_id': args['sort'], 'direction': args.get('dir', 'desc')}] if args.get('sort') else []
+
+    frames = attendance_frames(spec, user_data, sort_by, args.get('filter'))
+    return _csv_response(_csv_chunks(frames, list(DRILLDOWN_COLUMNS)), "attendance_drilldown.csv")
+
+def export_mandays():
+    """[?date=[&end=] | ?date=&view=mtd|month] - man-days summary, or the month views' ledger sums."""
+    user_data = _user_data()
+    args = request.args
+
+    def chunks():
+        if args.get('view') in ('mtd', 'month'): summary = mandays_report(user_data, args.get('date'), args['view'])
+        else: summary = mandays_summary(user_data, args.get('date'), args.get('end'))
+        yield from _csv_chunks([summary] if summary is not None else [], [], numbered=False)
+    return _csv_response(chunks(), "mandays_report.csv")
+
+# ---------------------------------------------------------
+# PDF REPORTS (run as jobs.submit background jobs)
+# ---------------------------------------------------------
+
+MANDAYS_PDF_COLUMNS = ['Shift', 'Department', 'Total_Emp', 'Std_Emp', 'Early_Emp', 'Extra_Emp', 'Sum_Extra_Hrs', 'Extra_MD', 'Good_Emp', 'Good_MD', 'OT_MD']
+MANDAYS_MONTH_PDF_COLUMNS = ['Shift', 'Department', 'Emp_Days', 'Peak_Emp'] + MANDAYS_PDF_COLUMNS[3:] + ['Utilisation']
+
+def attendance_pdf(job, spec, user_data, sort_by=None, filter_query=None):
+    total = int(read_sql(DRILLDOWN_COUNT, where=drilldown_filters(spec, user_data, filter_query))['n'].iloc[0])
+    job.progress(0, total)
+    write_table_pdf(job.result_path, "Attendance Report", attendance_frames(spec, user_data, sort_by, filter_query),
+                    list(DRILLDOWN_COLUMNS), total=total, progress=job.progress)
+
+def mandays_pdf(job, user_data, selected_date=None, view='day'):
+    summary = mandays_report(user_data, selected_date, view, progress=job.progress)
+    columns = MANDAYS_MONTH_PDF_COLUMNS if view in ('mtd', 'month') and selected_date else MANDAYS_PDF_COLUMNS
+    headers = [{'Sum_Extra_Hrs': "Ex. Hrs", 'Utilisation': "Util. %"}.get(col, col) for col in columns]
+    write_table_pdf(job.result_path, "Man Days Detailed Report", [summary] if summary is not None else [], columns,
+                    headers=headers, numbered=False, total=len(summary) if summary is not None else 0, progress=job.progress)
+
+def init_exports(app):
+    prefix = app.config.routes_pathname_prefix
+    app.server.add_url_rule(f"{prefix}export/attendance.csv", 'export_attendance', export_attendance)
+    app.server.add_url_rule(f"{prefix}export/mandays.csv", 'export_mandays', export_mandays)
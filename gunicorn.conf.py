@@ -0,0 +1,55 @@
+import multiprocessing
+import os
+
+# ---------------------------------------------------------
+# PRODUCTION SERVER (gunicorn -c gunicorn.conf.py app:server)
+# ---------------------------------------------------------
+# Preforked worker processes, serving one request at a time each. The app is
+# imported once in the master (preload_app) and forked, so workers start with the
+# pages, callbacks and reference data already loaded; refresh jobs (reference
+# data, rollup, anomalies, ledger) run once, in the master. Workers share query
+# results through the on-disk store in HR_SHARED_CACHE_DIR (see utils.ResultCache)
+# and background-callback results through app.BACKGROUND_CACHE_DIR.
+#
+# Every worker has its own connection pool: keep
+# HR_WEB_WORKERS * (HR_DB_POOL_SIZE + HR_DB_MAX_OVERFLOW) below Postgres' max_connections.
+#   HR_BIND (0.0.0.0:8050), HR_WEB_WORKERS, HR_WEB_THREADS (1), HR_WEB_TIMEOUT (s)
+
+# Read by utils at import, i.e. before the app is preloaded. Private to the service user
+# (utils.private_dir checks owner and mode 0700), next to the background-callback cache.
+os.environ.setdefault('HR_SHARED_CACHE_DIR', os.path.join(os.environ.get('HR_CACHE_DIR') or os.path.expanduser('~/.cache/hr_dashboard'), 'results'))
+
+bind = os.environ.get('HR_BIND', '0.0.0.0:8050')
+workers = int(os.environ.get('HR_WEB_WORKERS', min(multiprocessing.cpu_count() * 2 + 1, 9)))
+# Background callbacks fork a job process from the worker. With request threads, another
+# thread can be inside a diskcache (SQLite) transaction at that moment and the job then
+# blocks forever on the lock it inherited, so workers are single-threaded unless asked.
+threads = int(os.environ.get('HR_WEB_THREADS', 1))
+worker_class = 'gthread' if threads > 1 else 'sync'
+preload_app = True
+
+# Callbacks are bounded by HR_DB_STATEMENT_TIMEOUT_MS (60 s by default); leave room above it
+timeout = int(os.environ.get('HR_WEB_TIMEOUT', 120))
+graceful_timeout = 30
+
+# Recycle workers now and then; the shared cache survives them
+max_requests = 5000
+max_requests_jitter = 500
+
+accesslog = '-'
+
+def when_ready(server):
+    # Runs in the master after the app is preloaded and before any worker is forked
+    import app as dash_app
+    import utils
+    # Dash registers page callbacks on its first request; serve one here so workers are forked with them in place
+    dash_app.server.test_client().get(dash_app.app.get_relative_path('/_dash-dependencies'))
+    # Closed-day results never expire, so a restart (e.g. after a backfill) starts the shared store empty
+    utils.result_cache.clear()
+    try:
+        utils.refresh_reference_data(max_age=utils.REFERENCE_DATA_MIN_RELOAD_SECONDS)
+    except Exception as e:
+        server.log.warning(f"Reference data preload failed, workers will load it on demand: {e}")
+    # Plotly loads its template and trace validators on first use; do it once here instead of per worker
+    import plotly.graph_objects as go
+    utils.apply_minimalist_style(go.Figure([go.Bar(x=[0], y=[0]), go.Scatter(x=[0], y=[0])])).to_plotly_json()
@@ -0,0 +1,155 @@
+import json
+import os
+import re
+import shutil
+import time
+import urllib.parse
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import dash
+from dash import dcc, html, Input, Output, State, MATCH, callback
+import dash_bootstrap_components as dbc
+from flask import abort, request, send_file
+from utils import private_dir, resolve_user_context, CACHE_ROOT
+
+# ---------------------------------------------------------
+# BACKGROUND REPORT JOBS
+# ---------------------------------------------------------
+# Long-running exports (PDF reports) run on a small thread pool, off the request
+# that started them. Each job is a directory under JOBS_DIR holding status.json
+# (state, progress, error), the result file and, when requested, a `cancel`
+# marker. State lives on disk, so any worker process can report progress and
+# serve the result. Finished jobs are removed after JOB_TTL_SECONDS.
+# Reports hold employee data: JOBS_DIR is private to the service user
+# (utils.private_dir), and a result is only served to the empid that asked for it.
+
+JOBS_DIR = os.environ.get('HR_JOBS_DIR') or os.path.join(CACHE_ROOT, 'jobs')
+JOB_WORKERS = 2
+JOB_TTL_SECONDS = 3600
+POLL_INTERVAL_MS = 1000
+
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='report-job')
+
+class JobCancelled(Exception):
+    pass
+
+class Job:
+    def __init__(self, job_id):
+        if not re.fullmatch(r'[0-9a-f]{32}', job_id or ''): raise ValueError("Invalid job id")
+        self.id = job_id
+        self.dir = os.path.join(JOBS_DIR, job_id)
+        self.result_path = os.path.join(self.dir, 'result')
+
+    def status(self):
+        try:
+            with open(os.path.join(self.dir, 'status.json')) as f: return json.load(f)
+        except (FileNotFoundError, ValueError): return None
+
+    def update(self, **fields):
+        status = {**(self.status() or {}), **fields}
+        tmp = os.path.join(self.dir, 'status.json.tmp')
+        with open(tmp, 'w') as f: json.dump(status, f)
+        os.replace(tmp, os.path.join(self.dir, 'status.json'))
+
+    def progress(self, done, total=None):
+        """Reports progress from inside the job; raises JobCancelled once cancel() was called."""
+        if self.cancel_requested(): raise JobCancelled()
+        self.update(state='running', done=done, total=total)
+
+    def cancel(self):
+        open(os.path.join(self.dir, 'cancel'), 'w').close()
+
+    def cancel_requested(self):
+        return os.path.exists(os.path.join(self.dir, 'cancel'))
+
+def _run(job, fn, args):
+    try:
+        job.update(state='running')
+        fn(job, *args)
+        job.update(state='done', finished=time.time())
+    except JobCancelled:
+        job.update(state='cancelled', finished=time.time())
+    except Exception as e:
+        job.update(state='failed', error=str(e), finished=time.time())
+
+def _cleanup():
+    if not os.path.isdir(JOBS_DIR): return
+    cutoff = time.time() - JOB_TTL_SECONDS
+    for name in os.listdir(JOBS_DIR):
+        path = os.path.join(JOBS_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff: shutil.rmtree(path, ignore_errors=True)
+        except OSError: pass
+
+def submit(filename, empid, fn, *args):
+    """Runs fn(job, *args) in the background for `empid`; fn writes its output to job.result_path. Returns the job id."""
+    private_dir(JOBS_DIR)
+    _cleanup()
+    job = Job(uuid.uuid4().hex)
+    os.makedirs(job.dir, mode=0o700)
+    job.update(state='queued', done=0, total=None, filename=filename, empid=str(empid), created=time.time())
+    _executor.submit(_run, job, fn, args)
+    return job.id
+
+def download_result(job_id):
+    try: job = Job(job_id)
+    except ValueError: abort(404)
+    status = job.status()
+    if not status or status.get('state') != 'done' or not os.path.exists(job.result_path): abort(404)
+    # Same ?empid= check as the CSV exports, and only the requester's own report
+    empid = request.args.get('empid')
+    try: user_data = resolve_user_context(empid) if empid else None
+    except (TypeError, ValueError): user_data = None
+    if not user_data or not user_data.get('empid') or str(user_data['empid']) != status.get('empid'): abort(403)
+    return send_file(job.result_path, as_attachment=True, download_name=status.get('filename', 'report'))
+
+def init_jobs(app):
+    app.server.add_url_rule(f"{app.config.routes_pathname_prefix}jobs/<job_id>/download", 'download_job_result', download_result)
+
+# ---------------------------------------------------------
+# PROGRESS PANEL
+# ---------------------------------------------------------
+# Drop job_panel(name) into a layout and write the id returned by submit() to
+# {'type': 'job-store', 'name': name}; progress, cancel and the download link
+# are handled here for every panel.
+
+def job_panel(name):
+    return html.Div([
+        dcc.Store(id={'type': 'job-store', 'name': name}),
+        dcc.Interval(id={'type': 'job-poll', 'name': name}, interval=POLL_INTERVAL_MS, disabled=True),
+        html.Div(id={'type': 'job-status', 'name': name}, className="mt-2")
+    ])
+
+def render_job_status(job_id, status, name):
+    if not status: return dbc.Alert("Report job not found.", color="warning", className="small p-2 mb-0"), True
+    state = status.get('state')
+    if state == 'done':
+        link = dash.get_relative_path(f"/jobs/{job_id}/download") + '?' + urllib.parse.urlencode({'empid': status.get('empid')})
+        return dbc.Button([html.I(className="fa-solid fa-download me-2"), f"Download {status.get('filename', 'report')}"],
+                          href=link, external_link=True, color="primary", size="sm", className="w-100"), True
+    if state == 'failed': return dbc.Alert(f"Report failed: {status.get('error')}", color="danger", className="small p-2 mb-0"), True
+    if state == 'cancelled': return html.Small("Report cancelled.", className="text-muted"), True
+
+    done, total = status.get('done') or 0, status.get('total')
+    pct = int(100 * done / total) if total else 100
+    label = f"{done:,} / {total:,} rows" if total else f"{done:,} rows"
+    return dbc.Row([
+        dbc.Col(dbc.Progress(value=pct, label=label, striped=True, animated=True), width=9),
+        dbc.Col(dbc.Button("Cancel", id={'type': 'job-cancel', 'name': name}, color="secondary", outline=True, size="sm", className="w-100"), width=3)
+    ], className="g-2 align-items-center"), False
+
+@callback([Output({'type': 'job-status', 'name': MATCH}, 'children'), Output({'type': 'job-poll', 'name': MATCH}, 'disabled')],
+          [Input({'type': 'job-store', 'name': MATCH}, 'data'), Input({'type': 'job-poll', 'name': MATCH}, 'n_intervals')],
+          State({'type': 'job-store', 'name': MATCH}, 'id'))
+def poll_job(job_id, n_intervals, store_id):
+    if not job_id: return None, True
+    try: job = Job(job_id)
+    except ValueError: return None, True
+    return render_job_status(job_id, job.status(), store_id['name'])
+
+@callback(Output({'type': 'job-poll', 'name': MATCH}, 'n_intervals'), Input({'type': 'job-cancel', 'name': MATCH}, 'n_clicks'),
+          State({'type': 'job-store', 'name': MATCH}, 'data'), prevent_initial_call=True)
+def cancel_job(n_clicks, job_id):
+    if not n_clicks or not job_id: return dash.no_update
+    Job(job_id).cancel()
+    return 0
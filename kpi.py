@@ -0,0 +1,123 @@
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+import pandas as pd
+from queries import Filters, DAILY_PRESENT_COUNTS, SUPERVISOR_DAILY_PRESENT_COUNTS
+from utils import read_sql, attendance_statement, result_cache
+
+# ---------------------------------------------------------
+# PRESENT-COUNT KPIs
+# ---------------------------------------------------------
+# Distinct employees present per (scope, day), shared by every page's KPI tiles
+# and the weekly trend. Closed days never change, so their counts are memoized
+# per process; a window only queries the days not seen yet, in one grouped query.
+# Under gunicorn that query goes through the shared result cache, so the other
+# workers fill their memo from the first worker's answer.
+# Today is read through the result cache, which revalidates it against the
+# watermark. A scope is (company_id, plant_id, contractor_id, supervisor_id).
+
+DAILY_COUNTS_MAX_ENTRIES = 100_000
+
+_daily_counts = OrderedDict()
+_daily_counts_lock = threading.Lock()
+
+def _scope(company_id=None, plant_id=None, contractor_id=None, supervisor_id=None):
+    # Ids arrive as ints or strings (user-context-store keeps empid as given)
+    return tuple(int(v) if v not in (None, '') else None for v in (company_id, plant_id, contractor_id, supervisor_id))
+
+def _days(start, end):
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+def _remember(scope, counts):
+    with _daily_counts_lock:
+        for day, n in counts.items():
+            _daily_counts[(scope, day)] = n
+            _daily_counts.move_to_end((scope, day))
+        while len(_daily_counts) > DAILY_COUNTS_MAX_ENTRIES:
+            _daily_counts.popitem(last=False)
+
+def _recall(scope, days):
+    with _daily_counts_lock:
+        known = {day: _daily_counts[(scope, day)] for day in days if (scope, day) in _daily_counts}
+        for day in known: _daily_counts.move_to_end((scope, day))
+    return known
+
+def _query_daily_counts(start, end, scope, cache):
+    statement, day_column = attendance_statement(DAILY_PRESENT_COUNTS)
+    filters = Filters().scope(*scope).date_range(start, end, column=day_column)
+    df = read_sql(statement, where=filters, cache=cache)
+    return {pd.to_datetime(d).date(): int(n) for d, n in zip(df['day'], df['present'])}
+
+def get_daily_present_counts(start_date, end_date, company_id=None, plant_id=None, contractor_id=None, supervisor_id=None):
+    """Distinct employees present per day in [start_date, end_date], as {date: count}."""
+    start, end = pd.to_datetime(start_date).date(), pd.to_datetime(end_date).date()
+    scope = _scope(company_id, plant_id, contractor_id, supervisor_id)
+    today = date.today()
+    days = _days(start, end)
+
+    counts = _recall(scope, days)
+    missing = [d for d in days if d not in counts and d < today]
+    if missing:
+        # One query over the span of unknown closed days; days without rows are 0
+        fetched = _query_daily_counts(missing[0], missing[-1], scope, cache=result_cache.shared is not None)
+        closed = {day: fetched.get(day, 0) for day in _days(missing[0], missing[-1])}
+        _remember(scope, closed)
+        counts.update({day: closed[day] for day in missing})
+
+    if start <= today <= end:
+        counts.update(_query_daily_counts(today, today, scope, cache=True))
+    for day in days:
+        counts.setdefault(day, 0)
+    return counts
+
+def get_supervisor_counts(supervisor_id, selected_date, company_id=None, plant_id=None, contractor_id=None):
+    """Present count (as text for the KPI tile) of a supervisor's team on `selected_date`."""
+    if not supervisor_id or not selected_date: return "0"
+    try:
+        day = pd.to_datetime(selected_date).date()
+        return str(get_daily_present_counts(day, day, company_id, plant_id, contractor_id, supervisor_id)[day])
+    except Exception:
+        return "0"
+
+def get_present_counts_by_supervisor(supervisor_ids, start_date, end_date, company_id=None, plant_id=None, contractor_id=None):
+    """
+    {supervisor_id: {date: count}} for several supervisors at once (e.g. plant-wide
+    KPI tiles). Unknown closed days of all of them are fetched in one query grouped
+    by supervisor and day, and memoized per supervisor scope.
+    """
+    start, end = pd.to_datetime(start_date).date(), pd.to_datetime(end_date).date()
+    today = date.today()
+    days = _days(start, end)
+    scopes = {int(sid): _scope(company_id, plant_id, contractor_id, sid) for sid in supervisor_ids}
+
+    result = {sid: _recall(scope, days) for sid, scope in scopes.items()}
+    missing = sorted({d for sid in scopes for d in days if d not in result[sid] and d < today})
+    pending = [sid for sid in scopes if any(d not in result[sid] for d in missing)]
+    if pending:
+        fetched = _query_supervisor_counts(pending, missing[0], missing[-1], scopes[pending[0]], cache=False)
+        for sid in pending:
+            closed = {day: fetched.get((sid, day), 0) for day in _days(missing[0], missing[-1])}
+            _remember(scopes[sid], closed)
+            result[sid].update({day: closed[day] for day in days if day in closed})
+
+    if scopes and start <= today <= end:
+        fetched = _query_supervisor_counts(list(scopes), today, today, next(iter(scopes.values())), cache=True)
+        for sid in scopes: result[sid][today] = fetched.get((sid, today), 0)
+    for sid in scopes:
+        for day in days: result[sid].setdefault(day, 0)
+    return result
+
+def _query_supervisor_counts(supervisor_ids, start, end, scope, cache):
+    statement, day_column = attendance_statement(SUPERVISOR_DAILY_PRESENT_COUNTS)
+    company_id, plant_id, contractor_id, _ = scope
+    filters = (Filters().scope(company_id, plant_id, contractor_id).date_range(start, end, column=day_column)
+               .add("e.parent_id = ANY(:supervisor_ids)", supervisor_ids=sorted(supervisor_ids)))
+    df = read_sql(statement, where=filters, cache=cache)
+    return {(int(s), pd.to_datetime(d).date()): int(n) for s, d, n in zip(df['supervisor_id'], df['day'], df['present'])}
+
+def _reset_after_fork():
+    global _daily_counts_lock
+    _daily_counts_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'): os.register_at_fork(after_in_child=_reset_after_fork)
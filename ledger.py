@@ -0,0 +1,50 @@
+import sys
+from sqlalchemy import text
+from queries import Filters, MANDAYS_LEDGER_COLUMNS, MANDAYS_LEDGER_DAYS
+from refresh import refresh_incremental, start_refresher, touched_days
+
+# ---------------------------------------------------------
+# MAN-DAYS LEDGER (hr_mandays_ledger)
+# ---------------------------------------------------------
+# Same incremental scheme as rollup.py: each run rebuilds only the days that
+# have swipes written since the stored watermark (see refresh.py). Rows carry
+# the employee's scope and active flag at build time, so every day of the
+# employees whose scope or flag changed since then is rebuilt as well. Those come
+# from the hr_employee_changes trigger log (migration 0009): write_date moves on
+# any edit and would rebuild an employee's whole history for a phone number.
+
+WATERMARK_NAME = 'mandays_ledger'
+REBUILD_CHUNK_DAYS = 31
+ADVISORY_LOCK_KEY = 48151625
+
+def _rebuild(conn, since):
+    days = touched_days(conn, since)
+    if since is not None:
+        moved = conn.execute(text("""
+            SELECT DISTINCT DATE(a.check_in) FROM hr_attendance a
+            WHERE a.employee_id IN (SELECT employee_id FROM hr_employee_changes WHERE changed_at >= :since)
+                AND a.check_in IS NOT NULL
+        """), {'since': since})
+        days = sorted(set(days).union(row[0] for row in moved))
+        # Only this job reads the employee log
+        conn.execute(text("DELETE FROM hr_employee_changes WHERE changed_at < :since"), {'since': since})
+    if since is None: conn.execute(text("TRUNCATE hr_mandays_ledger"))
+    columns = ", ".join(MANDAYS_LEDGER_COLUMNS)
+    for i in range(0, len(days), REBUILD_CHUNK_DAYS):
+        chunk = days[i:i + REBUILD_CHUNK_DAYS]
+        rows = MANDAYS_LEDGER_DAYS.bind(days=Filters().date_range(chunk[0], chunk[-1]).add("DATE(a.check_in) = ANY(:days)", days=chunk))
+        conn.execute(text("DELETE FROM hr_mandays_ledger WHERE day = ANY(:days)"), {'days': chunk})
+        conn.execute(text(f"INSERT INTO hr_mandays_ledger ({columns}) {rows.sql}"), rows.params)
+    return len(days)
+
+def refresh_mandays_ledger(full=False):
+    """Brings hr_mandays_ledger up to date; returns the number of days rebuilt."""
+    return refresh_incremental(WATERMARK_NAME, ADVISORY_LOCK_KEY, _rebuild, full, change_logs=('hr_employee_changes',)) or 0
+
+def start_ledger_refresher(interval_seconds=60):
+    """Refreshes the ledger on a daemon thread every `interval_seconds`."""
+    return start_refresher(refresh_mandays_ledger, 'mandays-ledger', interval_seconds)
+
+if __name__ == '__main__':
+    rebuilt = refresh_mandays_ledger(full='--full' in sys.argv)
+    print(f"Rebuilt {rebuilt} day(s) of hr_mandays_ledger.")
@@ -0,0 +1,201 @@
+import bisect
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dash import DiskcacheManager
+from flask import Response, g, request
+
+# ---------------------------------------------------------
+# LATENCY METRICS
+# ---------------------------------------------------------
+# Every Dash callback request and every dashboard query (utils.read_sql /
+# stream_sql) is timed into per-name histograms with row and byte totals, served
+# in the Prometheus text format at /metrics together with the pool and result
+# cache gauges. Counts are per worker process. Background callbacks run in forked
+# jobs, so their requests (phase="run" submits, phase="poll" progress checks) are
+# short; TimedDiskcacheManager times the job itself in the fork and the worker
+# that hands out the result records it as phase="job".
+#
+# Queries slower than SLOW_QUERY_SECONDS are written to the `hr_dashboard.slow_queries`
+# log (HR_SLOW_QUERY_LOG names a file for it) with their SQL, parameters and
+# EXPLAIN plan. The plan is fetched off the request, at most once per statement
+# every SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SLOW_QUERY_SECONDS = float(os.environ.get('HR_SLOW_QUERY_SECONDS', 1.0))
+SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS = 300
+
+slow_query_log = logging.getLogger('hr_dashboard.slow_queries')
+if os.environ.get('HR_SLOW_QUERY_LOG'):
+    _handler = logging.FileHandler(os.environ['HR_SLOW_QUERY_LOG'])
+    _handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+    slow_query_log.addHandler(_handler)
+    slow_query_log.setLevel(logging.INFO)
+
+class Histogram:
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+class Series:
+    """Latency histogram plus additive totals (rows, bytes, errors, ...) of one label set."""
+    def __init__(self):
+        self.latency = Histogram()
+        self.totals = {}
+
+class Registry:
+    def __init__(self):
+        self.families = {'callback': {}, 'query': {}, 'slow_query': {}}
+        self._lock = threading.Lock()
+
+    def observe(self, family, labels, seconds, **totals):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self.families[family].setdefault(key, Series())
+            series.latency.observe(seconds)
+            for name, value in totals.items():
+                series.totals[name] = series.totals.get(name, 0) + value
+
+    def snapshot(self):
+        with self._lock:
+            return {family: {key: (list(s.latency.buckets), s.latency.count, s.latency.sum, dict(s.totals))
+                             for key, s in series.items()} for family, series in self.families.items()}
+
+registry = Registry()
+
+def observe_query(name, seconds, rows=0, nbytes=0):
+    registry.observe('query', {'statement': name or 'q'}, seconds, rows=rows, bytes=nbytes)
+
+# ---------------------------------------------------------
+# SLOW-QUERY LOG
+# ---------------------------------------------------------
+
+_explain_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='slow-query-explain')
+_explained_at = {}
+_explained_lock = threading.Lock()
+
+def _log_slow_query(name, sql, params, seconds, explain):
+    try: plan = explain()
+    except Exception as e: plan = f"(EXPLAIN failed: {e})"
+    slow_query_log.warning("slow query %s: %.3fs\n%s\nparams: %r\nplan:\n%s", name, seconds, sql.strip(), params, plan)
+
+def report_slow_query(name, sql, params, seconds, explain):
+    """Counts a query over SLOW_QUERY_SECONDS and logs it with `explain()`'s plan (rate-limited per statement)."""
+    registry.observe('slow_query', {'statement': name or 'q'}, seconds)
+    now = time.monotonic()
+    with _explained_lock:
+        if now - _explained_at.get(name, -SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS) < SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS: return
+        _explained_at[name] = now
+    _explain_executor.submit(_log_slow_query, name, sql, params, seconds, explain)
+
+def _reset_after_fork():
+    # Forked background-callback processes start with fresh counters and locks
+    global _explain_executor, _explained_lock
+    registry.__init__()
+    _explain_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='slow-query-explain')
+    _explained_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'): os.register_at_fork(after_in_child=_reset_after_fork)
+
+# ---------------------------------------------------------
+# CALLBACK TIMING & /metrics
+# ---------------------------------------------------------
+
+def _callback_label():
+    body = request.get_json(silent=True) or {}
+    return body.get('output', 'unknown')
+
+def _before_request():
+    if request.path.endswith('/_dash-update-component'): g.metrics_started = time.perf_counter()
+
+def _after_request(response):
+    started = g.pop('metrics_started', None)
+    if started is not None:
+        # Background callbacks are polled with ?cacheKey=; those requests only report progress
+        phase = 'poll' if request.args.get('cacheKey') else 'run'
+        registry.observe('callback', {'callback': _callback_label(), 'phase': phase}, time.perf_counter() - started,
+                         request_bytes=request.content_length or 0, response_bytes=response.calculate_content_length() or 0,
+                         errors=int(response.status_code >= 500))
+    return response
+
+class TimedDiskcacheManager(DiskcacheManager):
+    """DiskcacheManager that times each background job and records it when its result is served."""
+    def make_job_fn(self, fn, progress, key=None):
+        job_fn = super().make_job_fn(fn, progress, key)
+        def timed_job_fn(result_key, progress_key, args, context):
+            started = time.perf_counter()
+            try: job_fn(result_key, progress_key, args, context)
+            finally: self.handle.set(f"{result_key}-metrics", time.perf_counter() - started, expire=self.expire)
+        return timed_job_fn
+
+    def get_result(self, key, job):
+        result = super().get_result(key, job)
+        seconds = None if result is self.UNDEFINED else self.handle.pop(f"{key}-metrics", None)
+        # Results served from the cache (cache_by) ran no job and have no timing
+        if seconds is not None:
+            registry.observe('callback', {'callback': _callback_label(), 'phase': 'job'}, seconds,
+                             errors=int(isinstance(result, dict) and 'background_callback_error' in result))
+        return result
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(key, **extra):
+    pairs = list(key) + list(extra.items())
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}" if pairs else ""
+
+def _histogram_lines(metric, series):
+    lines = [f"# TYPE {metric} histogram"]
+    for key, (buckets, count, total, _) in series.items():
+        cumulative = 0
+        for bound, n in zip(list(LATENCY_BUCKETS) + ['+Inf'], buckets):
+            cumulative += n
+            lines.append(f"{metric}_bucket{_labels(key, le=bound)} {cumulative}")
+        lines.append(f"{metric}_sum{_labels(key)} {total:.6f}")
+        lines.append(f"{metric}_count{_labels(key)} {count}")
+    return lines
+
+def _counter_lines(metric, series, name):
+    lines = [f"# TYPE {metric} counter"]
+    lines += [f"{metric}{_labels(key)} {totals[name]}" for key, (_, _, _, totals) in series.items() if name in totals]
+    return lines
+
+def render_metrics(gauges=None):
+    """Prometheus text exposition of the registry plus `gauges` ({prefix: callable returning a dict, or a dict of dicts})."""
+    snapshot = registry.snapshot()
+    callbacks, queries = snapshot['callback'], snapshot['query']
+    lines = _histogram_lines('hr_dashboard_callback_seconds', callbacks)
+    lines += _counter_lines('hr_dashboard_callback_request_bytes_total', callbacks, 'request_bytes')
+    lines += _counter_lines('hr_dashboard_callback_response_bytes_total', callbacks, 'response_bytes')
+    lines += _counter_lines('hr_dashboard_callback_errors_total', callbacks, 'errors')
+    lines += _histogram_lines('hr_dashboard_query_seconds', queries)
+    lines += _counter_lines('hr_dashboard_query_rows_total', queries, 'rows')
+    lines += _counter_lines('hr_dashboard_query_frame_bytes_total', queries, 'bytes')
+    lines += ["# TYPE hr_dashboard_slow_queries_total counter"]
+    lines += [f"hr_dashboard_slow_queries_total{_labels(key)} {count}" for key, (_, count, _, _) in snapshot['slow_query'].items()]
+
+    for prefix, collect in (gauges or {}).items():
+        try: values = collect()
+        except Exception: continue
+        # {'primary': {...}, 'replica': {...}} becomes a `role` label; flat dicts have none
+        groups = values.items() if all(isinstance(v, dict) for v in values.values()) else [(None, values)]
+        for role, stats in groups:
+            key = (('role', role),) if role else ()
+            lines += [f"hr_dashboard_{prefix}_{name}{_labels(key)} {value}" for name, value in stats.items()
+                      if isinstance(value, (int, float)) and not isinstance(value, bool)]
+    return "\n".join(lines) + "\n"
+
+def init_metrics(app, gauges=None):
+    server = app.server
+    server.before_request(_before_request)
+    server.after_request(_after_request)
+    server.add_url_rule(f"{app.config.routes_pathname_prefix}metrics", 'metrics',
+                        lambda: Response(render_metrics(gauges), mimetype='text/plain; version=0.0.4'))
@@ -0,0 +1,63 @@
+import os
+import re
+import sys
+from sqlalchemy import text
+from utils import maintenance_connection
+
+# ---------------------------------------------------------
+# VERSIONED SQL MIGRATIONS
+# ---------------------------------------------------------
+# Applies migrations/NNNN_name.sql files in order, once each, recording them in
+# dashboard_schema_migrations. Statements run in autocommit mode so that
+# CREATE INDEX CONCURRENTLY is allowed.
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+def list_migrations():
+    files = sorted(f for f in os.listdir(MIGRATIONS_DIR) if re.match(r'^\d{4}_.*\.sql$', f))
+    return [(f[:4], f) for f in files]
+
+def split_statements(sql):
+    lines = [line for line in sql.splitlines() if not line.strip().startswith('--')]
+    # A ';' inside a $$-quoted body (e.g. a trigger function) does not end the statement
+    statements, current = [], ''
+    for i, chunk in enumerate("\n".join(lines).split('$$')):
+        if i % 2:
+            current += f"$${chunk}$$"
+            continue
+        first, *rest = chunk.split(';')
+        current += first
+        for piece in rest:
+            statements.append(current)
+            current = piece
+    statements.append(current)
+    return [stmt.strip() for stmt in statements if stmt.strip()]
+
+def applied_versions(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS dashboard_schema_migrations (
+            version varchar PRIMARY KEY,
+            name varchar NOT NULL,
+            applied_at timestamp NOT NULL DEFAULT now()
+        )
+    """))
+    return {row[0] for row in conn.execute(text("SELECT version FROM dashboard_schema_migrations"))}
+
+def migrate():
+    with maintenance_connection.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        done = applied_versions(conn)
+        for version, name in list_migrations():
+            if version in done: continue
+            print(f"Applying {name} ...")
+            with open(os.path.join(MIGRATIONS_DIR, name)) as f:
+                for stmt in split_statements(f.read()):
+                    conn.execute(text(stmt))
+            conn.execute(text("INSERT INTO dashboard_schema_migrations (version, name) VALUES (:v, :n)"), {'v': version, 'n': name})
+        print("Database is up to date.")
+
+if __name__ == '__main__':
+    try:
+        migrate()
+    except Exception as e:
+        print(f"Migration failed: {e}")
+        sys.exit(1)
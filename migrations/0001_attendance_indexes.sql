@@ -0,0 +1,15 @@
+-- Indexes backing the half-open check_in range predicates (utils.date_range_predicate)
+-- and the supervisor scope filter used by every page.
+-- Built CONCURRENTLY so they can be applied to a live database without blocking swipes.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS hr_attendance_check_in_idx
+    ON hr_attendance (check_in);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS hr_attendance_employee_check_in_idx
+    ON hr_attendance (employee_id, check_in);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS hr_employee_scope_idx
+    ON hr_employee (parent_id, active, company_id, plant_id);
+
+ANALYZE hr_attendance;
+ANALYZE hr_employee;
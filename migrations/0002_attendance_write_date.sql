@@ -0,0 +1,5 @@
+-- Keeps MAX(write_date) an index-only lookup for the result cache watermark
+-- (utils.ResultCache.current_watermark).
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS hr_attendance_write_date_idx
+    ON hr_attendance (write_date);
@@ -0,0 +1,24 @@
+-- One row per employee per day, maintained incrementally by rollup.py.
+-- Pages read this instead of raw swipes when utils.USE_ATTENDANCE_ROLLUP is on.
+
+CREATE TABLE IF NOT EXISTS hr_attendance_daily (
+    employee_id integer NOT NULL,
+    day date NOT NULL,
+    first_check_in timestamp NOT NULL,
+    last_check_out timestamp,
+    swipe_count integer NOT NULL,
+    has_open_session boolean NOT NULL,
+    assigned_shift_id integer,
+    worked_hours double precision NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, employee_id)
+);
+
+CREATE INDEX IF NOT EXISTS hr_attendance_daily_employee_day_idx
+    ON hr_attendance_daily (employee_id, day);
+
+-- Progress markers of incremental jobs (last processed hr_attendance.write_date)
+CREATE TABLE IF NOT EXISTS dashboard_watermarks (
+    name varchar PRIMARY KEY,
+    last_write_date timestamp,
+    refreshed_at timestamp NOT NULL DEFAULT now()
+);
@@ -0,0 +1,18 @@
+-- Partial indexes backing the one-scan master-data anomaly query
+-- (queries.MASTER_DATA_GAPS): each covers only the active employees missing one
+-- field, keyed like the supervisor scope, so the planner can BitmapOr the four
+-- small indexes instead of scanning hr_employee.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS hr_employee_gap_skills_idx
+    ON hr_employee (parent_id, create_date) WHERE active AND skills_status IS NULL;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS hr_employee_gap_contractor_idx
+    ON hr_employee (parent_id, create_date) WHERE active AND contractor_id IS NULL;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS hr_employee_gap_job_position_idx
+    ON hr_employee (parent_id, create_date) WHERE active AND job_position IS NULL;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS hr_employee_gap_department_idx
+    ON hr_employee (parent_id, create_date) WHERE active AND department_id IS NULL;
+
+ANALYZE hr_employee;
@@ -0,0 +1,20 @@
+-- Detected attendance anomalies, one row per employee, day and kind
+-- ('missed_checkout', 'multiple_checkin'), maintained incrementally by anomalies.py.
+-- Pages read the open rows instead of re-deriving them from raw swipes when
+-- utils.USE_ANOMALY_STORE is on.
+
+CREATE TABLE IF NOT EXISTS hr_attendance_anomaly (
+    day date NOT NULL,
+    kind varchar NOT NULL,
+    employee_id integer NOT NULL,
+    first_check_in timestamp NOT NULL,
+    swipe_count integer NOT NULL,
+    open_sessions integer NOT NULL,
+    status varchar NOT NULL DEFAULT 'open',
+    detected_at timestamp NOT NULL DEFAULT now(),
+    resolved_at timestamp,
+    PRIMARY KEY (day, kind, employee_id)
+);
+
+CREATE INDEX IF NOT EXISTS hr_attendance_anomaly_open_idx
+    ON hr_attendance_anomaly (day, employee_id) WHERE status = 'open';
@@ -0,0 +1,28 @@
+-- Man-days measures per day, scope, shift and department, maintained
+-- incrementally by ledger.py. Month and range views of the Man Days page sum
+-- these rows when utils.USE_MANDAYS_LEDGER is on.
+
+CREATE TABLE IF NOT EXISTS hr_mandays_ledger (
+    day date NOT NULL,
+    company_id integer,
+    plant_id integer,
+    contractor_id integer,
+    parent_id integer,
+    shift varchar NOT NULL,
+    department varchar NOT NULL,
+    std_hours double precision NOT NULL,
+    total_emp integer NOT NULL,
+    std_emp integer NOT NULL,
+    early_emp integer NOT NULL,
+    extra_emp integer NOT NULL,
+    sum_extra_hrs double precision NOT NULL,
+    good_emp integer NOT NULL,
+    sum_good_hrs double precision NOT NULL,
+    sum_ot_hrs double precision NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS hr_mandays_ledger_day_idx
+    ON hr_mandays_ledger (day);
+
+CREATE INDEX IF NOT EXISTS hr_mandays_ledger_supervisor_day_idx
+    ON hr_mandays_ledger (parent_id, day);
@@ -0,0 +1,31 @@
+-- Days that lost swipes. The refresh jobs find changed days through
+-- hr_attendance.write_date, which a deleted swipe, or one moved to another day
+-- or employee, no longer carries; this trigger records the day it left so
+-- refresh.touched_days rebuilds it too. Rows older than every job's watermark
+-- are pruned by the jobs.
+
+CREATE TABLE IF NOT EXISTS hr_attendance_changes (
+    employee_id integer,
+    day date NOT NULL,
+    changed_at timestamp NOT NULL DEFAULT (now() AT TIME ZONE 'UTC')
+);
+
+CREATE INDEX IF NOT EXISTS hr_attendance_changes_changed_at_idx
+    ON hr_attendance_changes (changed_at);
+
+CREATE OR REPLACE FUNCTION hr_attendance_log_change() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF OLD.check_in IS NOT NULL AND (TG_OP = 'DELETE'
+            OR OLD.employee_id IS DISTINCT FROM NEW.employee_id
+            OR DATE(OLD.check_in) IS DISTINCT FROM DATE(NEW.check_in)) THEN
+        INSERT INTO hr_attendance_changes (employee_id, day) VALUES (OLD.employee_id, DATE(OLD.check_in));
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS hr_attendance_log_change ON hr_attendance;
+
+CREATE TRIGGER hr_attendance_log_change
+    AFTER DELETE OR UPDATE OF check_in, employee_id ON hr_attendance
+    FOR EACH ROW EXECUTE FUNCTION hr_attendance_log_change();
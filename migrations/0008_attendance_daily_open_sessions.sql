@@ -0,0 +1,13 @@
+-- Open sessions per employee-day, so the rollup's anomaly views report the same
+-- count as raw swipes (has_open_session only says whether there is one).
+
+ALTER TABLE hr_attendance_daily ADD COLUMN IF NOT EXISTS open_sessions integer NOT NULL DEFAULT 0;
+
+UPDATE hr_attendance_daily r SET open_sessions = o.open_sessions
+FROM (
+    SELECT employee_id, DATE(check_in) as day, COUNT(*) as open_sessions
+    FROM hr_attendance
+    WHERE check_out IS NULL AND check_in IS NOT NULL AND employee_id IS NOT NULL
+    GROUP BY employee_id, DATE(check_in)
+) o
+WHERE r.employee_id = o.employee_id AND r.day = o.day;
@@ -0,0 +1,29 @@
+-- Employees whose scope or active flag changed. Ledger rows (hr_mandays_ledger)
+-- carry company, plant, contractor, supervisor, department and the active flag
+-- as of their build, so ledger.py rebuilds the days of the employees logged
+-- here. hr_employee.write_date moves on any edit (name, phone, ...) and would
+-- rebuild far more. Rows older than the ledger's watermark are pruned by it.
+
+CREATE TABLE IF NOT EXISTS hr_employee_changes (
+    employee_id integer NOT NULL,
+    changed_at timestamp NOT NULL DEFAULT (now() AT TIME ZONE 'UTC')
+);
+
+CREATE INDEX IF NOT EXISTS hr_employee_changes_changed_at_idx
+    ON hr_employee_changes (changed_at);
+
+CREATE OR REPLACE FUNCTION hr_employee_log_change() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'DELETE' OR ROW(OLD.company_id, OLD.plant_id, OLD.contractor_id, OLD.parent_id, OLD.department_id, OLD.active)
+            IS DISTINCT FROM ROW(NEW.company_id, NEW.plant_id, NEW.contractor_id, NEW.parent_id, NEW.department_id, NEW.active) THEN
+        INSERT INTO hr_employee_changes (employee_id) VALUES (OLD.id);
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS hr_employee_log_change ON hr_employee;
+
+CREATE TRIGGER hr_employee_log_change
+    AFTER DELETE OR UPDATE OF company_id, plant_id, contractor_id, parent_id, department_id, active ON hr_employee
+    FOR EACH ROW EXECUTE FUNCTION hr_employee_log_change();
@@ -1,9 +1,26 @@
 import dash
-from dash import dcc, html, Input, Output, State, callback
+from dash import dcc, html, dash_table, Input, Output, State, callback
 import dash_bootstrap_components as dbc
 import pandas as pd
+import plotly.graph_objects as go
+import json
+import math
 from datetime import date
-from utils import db_connection, create_user_status_widget, get_supervisor_counts
+from utils import read_sql, read_page, fan_out, attendance_statement, apply_minimalist_style, create_user_status_widget
+from kpi import get_supervisor_counts
+from queries import Filters, MISSED_CHECKOUTS, MULTIPLE_CHECKINS, MASTER_DATA_GAPS, ANOMALY_DAILY_COUNTS, ANOMALY_EMPLOYEE_DAYS, ANOMALY_KINDS, ANOMALY_PAGE_KEYS
+
+MASTER_TABLE_ROWS = 50
+RANGE_PAGE_SIZE = 50
+RANGE_COLUMNS = ["Date", "Name", "Employee Code", "Check-Ins", "Open"]
+
+def range_table(kind):
+    return dash_table.DataTable(
+        id=f'anomaly-range-{kind}', columns=[{'name': col, 'id': col} for col in RANGE_COLUMNS],
+        page_current=0, page_size=RANGE_PAGE_SIZE, page_count=0, page_action='custom',
+        style_table={'overflowX': 'auto'}, style_header={'fontWeight': 'bold'},
+        style_cell={'textAlign': 'left', 'fontSize': '0.8rem', 'padding': '4px 8px'}
+    )
 
 dash.register_page(__name__, path='/anomaly')
 
@@ -19,14 +36,21 @@ layout = dbc.Container([
     dbc.Row([
         dbc.Col([
             html.Label([html.I(className="fa-regular fa-calendar me-2"), "Select Date"], className="fw-bold small"),
-            dcc.DatePickerSingle(
+            html.Div(dcc.DatePickerSingle(
                 id='anomaly-date', 
                 date=date(2025, 11, 15), # Default fallback
                 min_date_allowed=date(2020, 1, 1),
                 max_date_allowed=date(2030, 12, 31),
                 display_format='Y-MM-DD',
                 className="d-block w-100 shadow-sm"
-            )
+            ), id='anomaly-single-picker'),
+            html.Div(dcc.DatePickerRange(
+                id='anomaly-range',
+                min_date_allowed=date(2020, 1, 1),
+                max_date_allowed=date(2030, 12, 31),
+                display_format='Y-MM-DD',
+                className="d-block w-100 shadow-sm"
+            ), id='anomaly-range-picker', style={'display': 'none'})
         ], width=4),
 
         dbc.Col([
@@ -43,14 +67,19 @@ layout = dbc.Container([
              ], className="shadow-sm border-0 h-100")
         ], width=4),
 
-        dbc.Col(width=4),
+        dbc.Col([
+            dbc.RadioItems(
+                id='anomaly-mode', value='single', inline=True, className="small",
+                options=[{'label': "Single Date", 'value': 'single'}, {'label': "Date Range", 'value': 'range'}]
+            )
+        ], width=4),
 
     ], className="mb-4 align-items-end"),
 
     html.Hr(), 
 
     # --- 3. ATTENDANCE ANOMALY TABLES ---
-    dbc.Row([
+    html.Div(id='anomaly-single-section', children=dbc.Row([
         dbc.Col(dbc.Card([
             dbc.CardHeader(
                 [html.I(className="fa-solid fa-user-slash me-2 text-danger"), "Missed Check-Out Details"], 
@@ -66,9 +95,31 @@ layout = dbc.Container([
             ), 
             dbc.CardBody(dcc.Loading(html.Div(id='tbl-multi', style={'maxHeight': '300px', 'overflowY': 'auto'})))
         ], className="shadow-sm border-0 h-100"), width=6),
-    ], className="mb-4"),
+    ], className="mb-4")),
+
+    # Date range mode: per-day counts and paged employee-day details from one grouped scan
+    html.Div(id='anomaly-range-section', style={'display': 'none'}, children=[
+        dcc.Store(id='anomaly-range-summary'),
+        dcc.Store(id='anomaly-range-missed-cursors', data={}),
+        dcc.Store(id='anomaly-range-multi-cursors', data={}),
+        dbc.Card(dbc.CardBody(dcc.Loading(dcc.Graph(id='anomaly-range-sparkline', config={'displayModeBar': False}))), className="shadow-sm border-0 mb-4"),
+        dbc.Row([
+            dbc.Col(dbc.Card([
+                dbc.CardHeader([html.I(className="fa-solid fa-user-slash me-2 text-danger"), "Missed Check-Out Days"],
+                               id="hdr-range-missed", className="fw-bold border-bottom d-flex align-items-center justify-content-between"),
+                dbc.CardBody(range_table('missed'))
+            ], className="shadow-sm border-0 h-100"), width=6),
+
+            dbc.Col(dbc.Card([
+                dbc.CardHeader([html.I(className="fa-solid fa-clock me-2 text-warning"), "Multiple Check-In Days"],
+                               id="hdr-range-multi", className="fw-bold border-bottom d-flex align-items-center justify-content-between"),
+                dbc.CardBody(range_table('multi'))
+            ], className="shadow-sm border-0 h-100"), width=6),
+        ], className="mb-4"),
+    ]),
 
     # --- 4. MASTER DATA ANOMALY TABLES ---
+    html.Div(dbc.Progress(id='anomaly-master-progress', value=0, striped=True, animated=True, className="mb-3"), id='anomaly-master-progress-wrap', style={'display': 'none'}),
     dbc.Row([
         dbc.Col(dbc.Card([
             dbc.CardHeader("Employees without Skills", id="hdr-skills", className="fw-bold border-bottom d-flex align-items-center justify-content-between"), 
@@ -124,13 +175,15 @@ def load_date_from_store(stored_date):
 
 @callback(
     Output('anomaly-status-widget', 'children'), 
-    [Input('user-context-store', 'data'), Input('anomaly-date', 'date')]
+    [Input('user-context-store', 'data'), Input('anomaly-date', 'date'),
+     Input('anomaly-mode', 'value'), Input('anomaly-range', 'start_date'), Input('anomaly-range', 'end_date')]
 )
-def update_anomaly_widget(user_data, selected_date):
+def update_anomaly_widget(user_data, selected_date, mode, start_date, end_date):
     if user_data is None: return dash.no_update
     emp_name = user_data.get('emp_name', 'Unknown')
     contractor = user_data.get('contractor_name', None)
-    date_display = str(selected_date) if selected_date else "Select Date"
+    if mode == 'range': date_display = f"{start_date} to {end_date}" if start_date and end_date else "Select Range"
+    else: date_display = str(selected_date) if selected_date else "Select Date"
     return create_user_status_widget(emp_name, contractor, date_display)
 
 # --- SUPERVISOR KPI CALLBACK ---
@@ -166,38 +219,15 @@ def update_attendance_tables(selected_date, user_data):
         mu = loading_state("Multiple Check-In", "fa-solid fa-clock")
         return m[0], m[1], mu[0], mu[1]
 
-    plant_id = user_data.get('plant_id')
-    company_id = user_data.get('company_id')
-    contractor_id = user_data.get('contractor_id')
-    supervisor_id = user_data.get('empid') 
-    
-    conditions = ["e.active = true"]
-    if company_id: conditions.append(f"e.company_id = {company_id}")
-    if plant_id: conditions.append(f"e.plant_id = {plant_id}")
-    if contractor_id: conditions.append(f"e.contractor_id = {contractor_id}")
-    if supervisor_id: conditions.append(f"e.parent_id = {supervisor_id}")
-    
-    date_cond = f"AND DATE(a.check_in) = '{selected_date}'" if selected_date else "AND 1=0"
-    join_sql = f"AND {' AND '.join(conditions)}"
-
-    q_missed = f"""
-        SELECT DATE(a.check_in) as "Date", e.name as "Name", e.employee_code as "Employee Code" 
-        FROM hr_attendance a LEFT JOIN hr_employee e ON a.employee_id = e.id 
-        WHERE a.check_out IS NULL {date_cond} {join_sql}
-        ORDER BY a.check_in DESC LIMIT 50
-    """
-    q_multi = f"""
-        SELECT DATE(a.check_in) as "Date", e.name as "Name", e.employee_code as "Employee Code", COUNT(*) as "Count"
-        FROM hr_attendance a LEFT JOIN hr_employee e ON a.employee_id = e.id 
-        WHERE 1=1 {date_cond} {join_sql} 
-        GROUP BY a.employee_id, DATE(a.check_in), e.name, e.employee_code
-        HAVING COUNT(*) > 1
-        ORDER BY "Date" DESC LIMIT 50
-    """
-
-    def process_data(query, title_text, icon_class, color_class):
+    missed_statement, day_column = attendance_statement(MISSED_CHECKOUTS)
+    multi_statement, _ = attendance_statement(MULTIPLE_CHECKINS)
+    filters = Filters().user_scope(user_data)
+    if selected_date: filters.date_range(selected_date, column=day_column)
+    else: filters.add("1=0")
+
+    def process_data(df, title_text, icon_class, color_class):
         try:
-            df = pd.read_sql(query, db_connection)
+            if isinstance(df, Exception): raise df
             count = len(df)
             header_content = html.Div([
                 html.Span([html.I(className=f"{icon_class} me-2 {color_class}"), title_text]),
@@ -210,35 +240,115 @@ def update_attendance_tables(selected_date, user_data):
             err_header = html.Div([html.Span(title_text), dbc.Badge("!", color="dark")])
             return dbc.Alert(f"Error: {e}", color="danger"), err_header
 
-    tbl_missed, hdr_missed = process_data(q_missed, "Missed Check-Out Details", "fa-solid fa-user-slash", "text-danger")
-    tbl_multi, hdr_multi = process_data(q_multi, "Multiple Check-In Details", "fa-solid fa-clock", "text-warning")
+    # Both tables are queried concurrently; a failure only affects its own table
+    df_missed, df_multi = fan_out([lambda: read_sql(missed_statement, where=filters), lambda: read_sql(multi_statement, where=filters)])
+    tbl_missed, hdr_missed = process_data(df_missed, "Missed Check-Out Details", "fa-solid fa-user-slash", "text-danger")
+    tbl_multi, hdr_multi = process_data(df_multi, "Multiple Check-In Details", "fa-solid fa-clock", "text-warning")
     return tbl_missed, hdr_missed, tbl_multi, hdr_multi
 
+# --- DATE RANGE MODE ---
+
+@callback(
+    [Output('anomaly-single-picker', 'style'), Output('anomaly-range-picker', 'style'),
+     Output('anomaly-single-section', 'style'), Output('anomaly-range-section', 'style'),
+     Output('anomaly-range', 'start_date'), Output('anomaly-range', 'end_date')],
+    Input('anomaly-mode', 'value'),
+    [State('anomaly-date', 'date'), State('anomaly-range', 'start_date'), State('anomaly-range', 'end_date')]
+)
+def toggle_anomaly_mode(mode, selected_date, start_date, end_date):
+    show, hide = {'display': 'block'}, {'display': 'none'}
+    if mode != 'range': return show, hide, show, hide, dash.no_update, dash.no_update
+    # First switch defaults to the month of the selected date, up to that date
+    if not start_date or not end_date:
+        end = pd.to_datetime(selected_date or date.today()).date()
+        start_date, end_date = end.replace(day=1).isoformat(), end.isoformat()
+    return hide, show, hide, show, start_date, end_date
+
+def range_scan(statement, summary, user_data):
+    statement, day_column = attendance_statement(statement)
+    return statement, Filters().user_scope(user_data).date_range(summary['start'], summary['end'], column=day_column)
+
+@callback(
+    [Output('anomaly-range-sparkline', 'figure'), Output('anomaly-range-summary', 'data')],
+    [Input('anomaly-mode', 'value'), Input('anomaly-range', 'start_date'), Input('anomaly-range', 'end_date'), Input('user-context-store', 'data')]
+)
+def update_range_summary(mode, start_date, end_date, user_data):
+    if mode != 'range' or not start_date or not end_date or user_data is None: return go.Figure(), None
+    summary = {'start': start_date, 'end': end_date}
+    try:
+        statement, scan = range_scan(ANOMALY_DAILY_COUNTS, summary, user_data)
+        df = read_sql(statement, scan=scan)
+    except Exception as e: return go.Figure().update_layout(title=f"Error: {e}"), None
+
+    summary.update(missed=int(df['missed'].sum()), multi=int(df['multi'].sum()))
+    days = pd.DataFrame({'day': pd.date_range(start_date, end_date).date})
+    df = days.merge(df, on='day', how='left').fillna({'missed': 0, 'multi': 0})
+    fig = go.Figure([
+        go.Scatter(x=df['day'], y=df['missed'], name="Missed Check-Out", mode='lines', line=dict(color='#dc3545', width=2)),
+        go.Scatter(x=df['day'], y=df['multi'], name="Multiple Check-In", mode='lines', line=dict(color='#fd7e14', width=2)),
+    ])
+    apply_minimalist_style(fig, height=160)
+    fig.update_layout(margin=dict(l=30, r=10, t=30, b=20))
+    return fig, summary
+
+def update_range_page(kind, title, icon_class, summary, page, page_size, cursors, user_data):
+    header = lambda count: html.Div([
+        html.Span([html.I(className=f"{icon_class} me-2"), title]),
+        dbc.Badge(f"{count:,}" if count is not None else "...", color="secondary" if not count else "danger", pill=True, className="ms-2")
+    ], className="d-flex align-items-center w-100 justify-content-between")
+    if not summary or user_data is None: return [], 0, 0, {}, header(None)
+
+    # Cursors (last key of each visited page) are only valid for the range that produced them
+    query_key = json.dumps([summary, user_data], sort_keys=True, default=str)
+    if not cursors or cursors.get('query') != query_key: cursors, page = {'query': query_key, 'pages': {}}, 0
+    page = page or 0
+    total = summary[kind]
+    if not total: return [], 0, 0, cursors, header(0)
+
+    try:
+        statement, scan = range_scan(ANOMALY_EMPLOYEE_DAYS, summary, user_data)
+        df, next_cursor = read_page(statement, ANOMALY_PAGE_KEYS, after=cursors['pages'].get(str(page)), page=page, page_size=page_size,
+                                    where=Filters(ANOMALY_KINDS[kind]), scan=scan)
+    except Exception as e: return [], 0, 0, cursors, html.Div([html.Span(title), dbc.Badge("!", color="dark")], title=str(e))
+    if next_cursor: cursors['pages'][str(page + 1)] = next_cursor
+    df['Date'] = df['Date'].astype(str)
+    return df.to_dict('records'), math.ceil(total / page_size), page, cursors, header(total)
+
+@callback(
+    [Output('anomaly-range-missed', 'data'), Output('anomaly-range-missed', 'page_count'), Output('anomaly-range-missed', 'page_current'),
+     Output('anomaly-range-missed-cursors', 'data'), Output('hdr-range-missed', 'children')],
+    [Input('anomaly-range-summary', 'data'), Input('anomaly-range-missed', 'page_current')],
+    [State('anomaly-range-missed', 'page_size'), State('anomaly-range-missed-cursors', 'data'), State('user-context-store', 'data')]
+)
+def update_range_missed(summary, page, page_size, cursors, user_data):
+    return update_range_page('missed', "Missed Check-Out Days", "fa-solid fa-user-slash text-danger", summary, page, page_size, cursors, user_data)
+
+@callback(
+    [Output('anomaly-range-multi', 'data'), Output('anomaly-range-multi', 'page_count'), Output('anomaly-range-multi', 'page_current'),
+     Output('anomaly-range-multi-cursors', 'data'), Output('hdr-range-multi', 'children')],
+    [Input('anomaly-range-summary', 'data'), Input('anomaly-range-multi', 'page_current')],
+    [State('anomaly-range-multi', 'page_size'), State('anomaly-range-multi-cursors', 'data'), State('user-context-store', 'data')]
+)
+def update_range_multi(summary, page, page_size, cursors, user_data):
+    return update_range_page('multi', "Multiple Check-In Days", "fa-solid fa-clock text-warning", summary, page, page_size, cursors, user_data)
+
 @callback(
     [Output('tbl-skills', 'children'), Output('hdr-skills', 'children'),
      Output('tbl-contractor', 'children'), Output('hdr-contractor', 'children'),
      Output('tbl-desig', 'children'), Output('hdr-desig', 'children'),
      Output('tbl-dept', 'children'), Output('hdr-dept', 'children')],
-    [Input('user-context-store', 'data')]
+    [Input('user-context-store', 'data')],
+    background=True,
+    running=[(Output('anomaly-master-progress-wrap', 'style'), {'display': 'block'}, {'display': 'none'})],
+    progress=[Output('anomaly-master-progress', 'value'), Output('anomaly-master-progress', 'label')],
+    cancel=[Input('url', 'pathname')]
 )
-def update_master_tables(user_data):
+def update_master_tables(set_progress, user_data):
     def loading_state(title):
         header = html.Div([html.Span(title), dbc.Badge("...", color="secondary")], className="d-flex justify-content-between")
         return html.Div("Loading..."), header
     if user_data is None: return (loading_state("Skills") + loading_state("Contractor") + loading_state("Salary Category") + loading_state("Department"))
 
-    plant_id = user_data.get('plant_id')
-    company_id = user_data.get('company_id')
-    contractor_id = user_data.get('contractor_id')
-    supervisor_id = user_data.get('empid') 
-    
-    conditions = ["active = true"] 
-    if company_id: conditions.append(f"company_id = {company_id}")
-    if plant_id: conditions.append(f"plant_id = {plant_id}")
-    if contractor_id: conditions.append(f"contractor_id = {contractor_id}")
-    if supervisor_id: conditions.append(f"parent_id = {supervisor_id}")
-    where_base = "WHERE " + " AND ".join(conditions)
-
     def get_doj_style(doj_val):
         if pd.isna(doj_val): return {}
         doj_date = doj_val.date() if hasattr(doj_val, 'date') else doj_val
@@ -247,11 +357,12 @@ def update_master_tables(user_data):
         elif diff_days <= 7: return {'color': '#fd7e14', 'fontWeight': 'bold'}
         else: return {'color': '#dc3545', 'fontWeight': 'bold'}
 
-    def process_master_table(cond, title):
-        query = f"SELECT create_date, name as \"Name\", employee_code as \"Employee Code\" FROM hr_employee {where_base} AND {cond} ORDER BY create_date DESC LIMIT 50"
+    def process_master_table(gaps, category, title):
         try:
-            df = pd.read_sql(query, db_connection)
-            count = len(df)
+            if isinstance(gaps, Exception): raise gaps
+            rows_of = gaps[gaps['category'] == category]
+            count = int(rows_of['total'].iloc[0]) if len(rows_of) else 0
+            df = rows_of[rows_of['rn'].notna()]
             header_content = html.Div([html.Span(title), dbc.Badge(f"{count}", color="secondary" if count == 0 else "danger", pill=True, className="ms-2")], className="d-flex align-items-center w-100 justify-content-between")
             if df.empty: tbl = dbc.Alert("Clean Data!", color="success", className="mb-0")
             else:
@@ -264,10 +375,15 @@ def update_master_tables(user_data):
             return tbl, header_content
         except: return dbc.Alert("Error", color="danger"), html.Div(title)
 
-    r1 = process_master_table("skills_status IS NULL", "Employees without Skills")
-    r2 = process_master_table("contractor_id IS NULL", "Employees without Contractor ID")
-    r3 = process_master_table("job_position IS NULL", "Employees without Salary Category")
-    r4 = process_master_table("department_id IS NULL", "Employees without Department")
+    # One scan returns every category's exact total and its newest MASTER_TABLE_ROWS rows
+    set_progress((0, "Querying"))
+    try: gaps = read_sql(MASTER_DATA_GAPS, {'limit': MASTER_TABLE_ROWS}, where=Filters().user_scope(user_data, alias=None))
+    except Exception as e: gaps = e
+    set_progress((100, "Building tables"))
+    r1 = process_master_table(gaps, 'skills', "Employees without Skills")
+    r2 = process_master_table(gaps, 'contractor', "Employees without Contractor ID")
+    r3 = process_master_table(gaps, 'job_position', "Employees without Salary Category")
+    r4 = process_master_table(gaps, 'department', "Employees without Department")
     return r1[0], r1[1], r2[0], r2[1], r3[0], r3[1], r4[0], r4[1]
 
 
@@ -1,19 +1,29 @@
 import dash
-from dash import dcc, html, Input, Output, State, callback, callback_context, no_update
+from dash import dcc, html, dash_table, Input, Output, State, callback, callback_context, clientside_callback, ClientsideFunction, no_update
 import dash_bootstrap_components as dbc
 import pandas as pd
 import plotly.graph_objects as go
+import json
+import math
 from datetime import date, timedelta
-from utils import db_connection, build_base_query, apply_minimalist_style, render_info_tooltip, create_user_status_widget, get_supervisor_counts
-from fpdf import FPDF
+from utils import read_sql, read_page, apply_minimalist_style, render_info_tooltip, create_user_status_widget, get_attendance_snapshot, format_drilldown
+from kpi import get_daily_present_counts, get_supervisor_counts
+from queries import CROSS_FILTER_COLUMNS, DRILLDOWN, DRILLDOWN_COUNT, DRILLDOWN_COLUMNS, drilldown_filters, drilldown_order
+from exports import export_url, attendance_pdf
+from jobs import submit, job_panel
 
 dash.register_page(__name__, path='/')
 
+# When True the day's per-employee facts are shipped to the browser once and the
+# breakdown charts cross-filter client-side (assets/attendance_crossfilter.js).
+CLIENTSIDE_CROSSFILTER = True
+
+DRILLDOWN_PAGE_SIZE = 50
+
 layout = dbc.Container([
     dcc.Store(id='drilldown-store'),
-    dcc.Download(id="download-dataframe-csv"),
-    dcc.Download(id="download-dataframe-pdf"),
     dcc.Store(id='interaction-store', data={}), 
+    dcc.Store(id='crossfilter-facts-store'),
 
     # Header
     html.H3([html.I(className="fa-solid fa-users me-2"), "Attendance Analytics"], className="mb-4 text-primary fw-bold"),
@@ -105,10 +115,20 @@ layout = dbc.Container([
         id="details-offcanvas", title="Drill-Down Details", is_open=False, placement="end", style={"width": "50%"},
         children=[
             dbc.Row([
-                dbc.Col(dbc.Button([html.I(className="fa-solid fa-file-csv me-2"), "Export CSV"], id="btn-download", color="success", size="sm", className="w-100"), width=6),
+                dbc.Col(dbc.Button([html.I(className="fa-solid fa-file-csv me-2"), "Export CSV"], id="btn-download", color="success", size="sm", className="w-100", external_link=True), width=6),
                 dbc.Col(dbc.Button([html.I(className="fa-solid fa-file-pdf me-2"), "Export PDF"], id="btn-download-pdf", color="danger", size="sm", className="w-100"), width=6),
-            ], className="mb-3"),
-            html.Div(id='table-container')
+            ], className="mb-2"),
+            html.Div(job_panel('attendance-pdf'), className="mb-3"),
+            html.Div(id='table-container', className="small text-muted mb-2"),
+            # Pages, sorting and filtering all run in SQL; only the visible page is sent
+            dash_table.DataTable(
+                id='drilldown-table', columns=[{'name': col, 'id': col} for col in DRILLDOWN_COLUMNS],
+                page_current=0, page_size=DRILLDOWN_PAGE_SIZE, page_count=0, page_action='custom',
+                sort_action='custom', sort_mode='single', sort_by=[], filter_action='custom', filter_query='',
+                style_table={'overflowX': 'auto'}, style_header={'fontWeight': 'bold'},
+                style_cell={'textAlign': 'left', 'fontSize': '0.8rem', 'padding': '4px 8px'}
+            ),
+            dcc.Store(id='drilldown-cursors', data={})
         ]
     )
 ], fluid=True)
@@ -139,8 +159,35 @@ def update_supervisor_kpi(selected_date, user_data):
     if user_data is None or not selected_date: return "0 / 0"
     return get_supervisor_counts(user_data.get('empid'), selected_date, user_data.get('company_id'), user_data.get('plant_id'), user_data.get('contractor_id'))
 
+# --- DAILY SNAPSHOT (shared by every chart below) ---
+def get_snapshot(selected_date, user_data):
+    return get_attendance_snapshot(selected_date, user_data.get('company_id'), user_data.get('plant_id'), user_data.get('contractor_id'), user_data.get('empid'))
+
+def apply_cross_filter(df, filter_data, source):
+    if not filter_data or filter_data.get('source') == source or filter_data.get('col') not in CROSS_FILTER_COLUMNS: return df
+    return df[df[filter_data['col']] == filter_data['val']]
+
+def count_by(df, col, label='label', value='val'):
+    return df.groupby(col).size().reset_index(name=value).rename(columns={col: label})
+
+def server_crossfilter(*args, **kwargs):
+    """`callback` for the server-side cross-filter path; a no-op in clientside mode."""
+    if CLIENTSIDE_CROSSFILTER: return lambda fn: fn
+    return callback(*args, **kwargs)
+
+def pack_facts(snapshot, company_id=None):
+    """Snapshot as dictionary-encoded columns: sorted labels plus one code per employee."""
+    # Same predicate as update_shift_figure, over the company-scoped snapshot
+    shift_ok = snapshot['shift_active'].eq(True)
+    if company_id: shift_ok &= snapshot['shift_company_id'] == company_id
+    facts = {'n': len(snapshot), 'shift_ok': shift_ok.astype(int).tolist()}
+    for col in CROSS_FILTER_COLUMNS:
+        codes, labels = pd.factorize(snapshot[col], sort=True)
+        facts[col] = {'labels': labels.tolist(), 'codes': codes.tolist()}
+    return facts
+
 # --- INTERACTION STORE ---
-@callback(Output('interaction-store', 'data'),
+@server_crossfilter(Output('interaction-store', 'data'),
     [Input('department-bar-graph', 'clickData'), Input('gender-bar-graph', 'clickData'),
      Input('skills-bar-graph', 'clickData'), Input('shift-bar-graph', 'clickData'),
      Input('btn-clear-filter', 'n_clicks')])
@@ -150,10 +197,10 @@ def update_interaction_store(dept_click, gender_click, skills_click, shift_click
     trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
     if trigger_id == 'btn-clear-filter': return {}
     
-    if trigger_id == 'department-bar-graph' and dept_click: return {'col': 'COALESCE(d.name, \'Unknown\')', 'val': dept_click['points'][0]['y'], 'source': trigger_id}
-    if trigger_id == 'gender-bar-graph' and gender_click: return {'col': "COALESCE(e.gender, 'Unknown')", 'val': gender_click['points'][0]['x'], 'source': trigger_id}
-    if trigger_id == 'skills-bar-graph' and skills_click: return {'col': "COALESCE(e.skills_status, 'Unknown')", 'val': skills_click['points'][0]['x'], 'source': trigger_id}
-    if trigger_id == 'shift-bar-graph' and shift_click: return {'col': "COALESCE(s.name, 'Unknown')", 'val': shift_click['points'][0]['x'], 'source': trigger_id}
+    if trigger_id == 'department-bar-graph' and dept_click: return {'col': 'dept_name', 'val': dept_click['points'][0]['y'], 'source': trigger_id}
+    if trigger_id == 'gender-bar-graph' and gender_click: return {'col': 'gender', 'val': gender_click['points'][0]['x'], 'source': trigger_id}
+    if trigger_id == 'skills-bar-graph' and skills_click: return {'col': 'skills', 'val': skills_click['points'][0]['x'], 'source': trigger_id}
+    if trigger_id == 'shift-bar-graph' and shift_click: return {'col': 'shift', 'val': shift_click['points'][0]['x'], 'source': trigger_id}
     return {}
 
 def get_colors(df, category_col, filter_data, default_color, grey_color='#adb5bd'):
@@ -165,27 +212,17 @@ def get_colors(df, category_col, filter_data, default_color, grey_color='#adb5bd
 @callback(Output('weekly-attendance-graph', 'figure'), [Input('att-date', 'date'), Input('user-context-store', 'data')])
 def update_weekly_graph(selected_date, user_data):
     if user_data is None or not selected_date: return dash.no_update
-    plant_id, company_id, contractor_id = user_data.get('plant_id'), user_data.get('company_id'), user_data.get('contractor_id')
-    supervisor_id = user_data.get('empid')
-
     sel_dt = pd.to_datetime(selected_date).date()
     q_start = sel_dt - timedelta(days=sel_dt.weekday() + 7) 
     q_end = q_start + timedelta(days=13)
 
-    joins, where_clause = build_base_query(plant_id, company_id, None, contractor_id)
-    if supervisor_id: where_clause += f" AND e.parent_id = {supervisor_id}"
-    full_query = f"SELECT a.check_in, a.employee_id FROM hr_attendance a {joins} {where_clause} AND DATE(a.check_in) >= '{q_start}' AND DATE(a.check_in) <= '{q_end}'"
-
     try:
-        df = pd.read_sql(full_query, db_connection)
+        counts = get_daily_present_counts(q_start, q_end, user_data.get('company_id'), user_data.get('plant_id'), user_data.get('contractor_id'), user_data.get('empid'))
     except Exception as e: return go.Figure().update_layout(title=f"Error: {e}")
 
-    if df.empty: df_final = pd.DataFrame({'date': [sel_dt], 'count': [0]})
-    else:
-        df['check_in'] = pd.to_datetime(df['check_in'], errors='coerce')
-        df_grouped = df.dropna(subset=['check_in']).copy()
-        df_grouped['date'] = df_grouped['check_in'].dt.date
-        df_final = df_grouped.groupby('date')['employee_id'].nunique().reset_index(name='count').sort_values('date')
+    # Only days with attendance are plotted
+    df_final = pd.DataFrame(sorted((d, n) for d, n in counts.items() if n), columns=['date', 'count'])
+    if df_final.empty: df_final = pd.DataFrame({'date': [sel_dt], 'count': [0]})
     
     # Preserving Blue Color (#0d6efd) from local code
     colors = ['#0d6efd' if d == sel_dt else '#adb5bd' for d in df_final['date']]
@@ -200,36 +237,16 @@ def update_weekly_graph(selected_date, user_data):
     return fig
 
 # --- GRAPH 2: DEPARTMENT (BLUE) ---
-@callback(Output('department-bar-graph', 'figure'), 
+@server_crossfilter(Output('department-bar-graph', 'figure'), 
           [Input('weekly-attendance-graph', 'clickData'), Input('att-date', 'date'), Input('interaction-store', 'data'), Input('user-context-store', 'data')])
 def update_department_figure(clickData, date_picker_val, filter_data, user_data):
     if user_data is None: return dash.no_update
     clicked_date = clickData['points'][0]['x'] if (callback_context.triggered and 'weekly' in callback_context.triggered[0]['prop_id'] and clickData) else date_picker_val
     if not clicked_date: return go.Figure()
 
-    plant_id, company_id, contractor_id, supervisor_id = user_data.get('plant_id'), user_data.get('company_id'), user_data.get('contractor_id'), user_data.get('empid')
-    
-    conditions = ["e.active = true"]
-    if company_id: conditions.append(f"e.company_id = {company_id}")
-    if plant_id: conditions.append(f"e.plant_id = {plant_id}")
-    if contractor_id: conditions.append(f"e.contractor_id = {contractor_id}")
-    if supervisor_id: conditions.append(f"e.parent_id = {supervisor_id}")
-    if filter_data and filter_data.get('source') != 'department-bar-graph': conditions.append(f"{filter_data['col']} = '{filter_data['val']}'")
-    where_sql = (" AND " + " AND ".join(conditions))
-
-    query = f"""
-    SELECT COALESCE(d.name, 'Unknown') as dept_name, COUNT(DISTINCT a.employee_id) as present_count
-    FROM hr_attendance a
-    JOIN hr_employee e ON a.employee_id = e.id
-    LEFT JOIN hr_department d ON e.department_id = d.id 
-    LEFT JOIN plant_contractor c ON e.contractor_id = c.id
-    LEFT JOIN resource_calendar s ON a.assigned_shift_id = s.id
-    WHERE DATE(a.check_in) = '{clicked_date}' {where_sql}
-    GROUP BY 1 ORDER BY present_count ASC
-    """
-    
     try:
-        df = pd.read_sql(query, db_connection)
+        df = apply_cross_filter(get_snapshot(clicked_date, user_data), filter_data, 'department-bar-graph')
+        df = count_by(df, 'dept_name', 'dept_name', 'present_count').sort_values('present_count')
         if df.empty: return go.Figure().update_layout(title="No Data")
         
         is_self = (filter_data and filter_data.get('source') == 'department-bar-graph')
@@ -245,33 +262,17 @@ def update_department_figure(clickData, date_picker_val, filter_data, user_data)
     except: return go.Figure()
 
 # --- GRAPH 3 & 4: GENDER / SKILLS (BLUE) ---
-@callback([Output('gender-bar-graph', 'figure'), Output('skills-bar-graph', 'figure')],
+@server_crossfilter([Output('gender-bar-graph', 'figure'), Output('skills-bar-graph', 'figure')],
     [Input('weekly-attendance-graph', 'clickData'), Input('att-date', 'date'), Input('interaction-store', 'data'), Input('user-context-store', 'data')])
 def update_gender_skills_figures(clickData, date_picker_val, filter_data, user_data):
     if user_data is None: return go.Figure(), go.Figure()
     clicked_date = clickData['points'][0]['x'] if (callback_context.triggered and 'weekly' in callback_context.triggered[0]['prop_id'] and clickData) else date_picker_val
     if not clicked_date: return go.Figure(), go.Figure()
 
-    plant_id, company_id, contractor_id, supervisor_id = user_data.get('plant_id'), user_data.get('company_id'), user_data.get('contractor_id'), user_data.get('empid')
-    base_conds = ["e.active = true"]
-    if company_id: base_conds.append(f"e.company_id = {company_id}")
-    if plant_id: base_conds.append(f"e.plant_id = {plant_id}")
-    if contractor_id: base_conds.append(f"e.contractor_id = {contractor_id}")
-    if supervisor_id: base_conds.append(f"e.parent_id = {supervisor_id}")
-
-    g_conds, s_conds = base_conds.copy(), base_conds.copy()
-    if filter_data:
-        if filter_data.get('source') != 'gender-bar-graph': g_conds.append(f"{filter_data['col']} = '{filter_data['val']}'")
-        if filter_data.get('source') != 'skills-bar-graph': s_conds.append(f"{filter_data['col']} = '{filter_data['val']}'")
-
-    def get_query(select, conds):
-        where = f"WHERE DATE(a.check_in) = '{clicked_date}'"
-        if conds: where += " AND " + " AND ".join(conds)
-        return f" {select} FROM hr_attendance a JOIN hr_employee e ON a.employee_id = e.id LEFT JOIN hr_department d ON e.department_id = d.id LEFT JOIN resource_calendar s ON a.assigned_shift_id = s.id LEFT JOIN plant_contractor c ON e.contractor_id = c.id {where} GROUP BY 1"
-
     try:
-        df_g = pd.read_sql(get_query("SELECT COALESCE(e.gender, 'Unknown') as label, COUNT(DISTINCT a.employee_id) as val", g_conds), db_connection)
-        df_s = pd.read_sql(get_query("SELECT COALESCE(e.skills_status, 'Unknown') as label, COUNT(DISTINCT a.employee_id) as val", s_conds), db_connection)
+        snapshot = get_snapshot(clicked_date, user_data)
+        df_g = count_by(apply_cross_filter(snapshot, filter_data, 'gender-bar-graph'), 'gender')
+        df_s = count_by(apply_cross_filter(snapshot, filter_data, 'skills-bar-graph'), 'skills')
         
         c_g = get_colors(df_g, 'label', filter_data if filter_data and filter_data.get('source') == 'gender-bar-graph' else None, '#0d6efd')
         c_s = get_colors(df_s, 'label', filter_data if filter_data and filter_data.get('source') == 'skills-bar-graph' else None, '#0d6efd')
@@ -285,7 +286,7 @@ def update_gender_skills_figures(clickData, date_picker_val, filter_data, user_d
     except: return go.Figure(), go.Figure()
 
 # --- GRAPH 5: SHIFT (Deduped & Blue) ---
-@callback(Output('shift-bar-graph', 'figure'), 
+@server_crossfilter(Output('shift-bar-graph', 'figure'), 
           [Input('weekly-attendance-graph', 'clickData'), 
            Input('att-date', 'date'), 
            Input('interaction-store', 'data'), 
@@ -301,46 +302,14 @@ def update_shift_figure(clickData, date_picker_val, filter_data, user_data):
 
     if not clicked_date: return go.Figure()
     
-    # 2. Get User Context Filters
-    plant_id = user_data.get('plant_id')
-    company_id = user_data.get('company_id') 
-    contractor_id = user_data.get('contractor_id') 
-    supervisor_id = user_data.get('empid')
-    
-    # 3. Build Filters
-    conds = ["s.active = True", "e.active = true"]
-    if company_id: conds.append(f"s.company_id = {company_id}")
-    if plant_id: conds.append(f"e.plant_id = {plant_id}")
-    if contractor_id: conds.append(f"e.contractor_id = {contractor_id}")
-    if supervisor_id: conds.append(f"e.parent_id = {supervisor_id}")
-
-    if filter_data and filter_data.get('source') != 'shift-bar-graph': 
-        conds.append(f"{filter_data['col']} = '{filter_data['val']}'")
-    
-    where_sql = "WHERE " + " AND ".join(conds)
-
-    # 4. UPDATED QUERY with Deduplication Logic (Preserved from local)
-    query = f"""
-    WITH first_swipes AS (
-        SELECT DISTINCT ON (a.employee_id) 
-            a.employee_id, 
-            a.assigned_shift_id
-        FROM hr_attendance a
-        WHERE DATE(a.check_in) = '{clicked_date}'
-        ORDER BY a.employee_id, a.check_in ASC
-    )
-    SELECT COALESCE(s.name, 'Unknown') as label, COUNT(fs.employee_id) as val
-    FROM first_swipes fs
-    JOIN hr_employee e ON fs.employee_id = e.id
-    LEFT JOIN resource_calendar s ON fs.assigned_shift_id = s.id 
-    LEFT JOIN hr_department d ON e.department_id = d.id
-    LEFT JOIN plant_contractor c ON e.contractor_id = c.id
-    {where_sql}
-    GROUP BY s.name
-    """
-    
+    # 2. Group the shared snapshot (shift = first swipe of the day, active shifts only).
+    # The snapshot is scoped by the employee's company like every other chart, so an
+    # employee of another company on one of this company's shifts is no longer counted.
     try:
-        df = pd.read_sql(query, db_connection)
+        df = apply_cross_filter(get_snapshot(clicked_date, user_data), filter_data, 'shift-bar-graph')
+        df = df[df['shift_active'] == True]
+        if user_data.get('company_id'): df = df[df['shift_company_id'] == user_data.get('company_id')]
+        df = count_by(df, 'shift')
         
         is_self = (filter_data and filter_data.get('source') == 'shift-bar-graph')
         colors = get_colors(df, 'label', filter_data if is_self else None, '#0d6efd') # Blue color
@@ -355,64 +324,88 @@ def update_shift_figure(clickData, date_picker_val, filter_data, user_data):
     except Exception: 
         return go.Figure()
 
+# --- CLIENT-SIDE CROSS-FILTERING ---
+if CLIENTSIDE_CROSSFILTER:
+    @callback(Output('crossfilter-facts-store', 'data'),
+              [Input('weekly-attendance-graph', 'clickData'), Input('att-date', 'date'), Input('user-context-store', 'data')])
+    def update_crossfilter_facts(clickData, date_picker_val, user_data):
+        if user_data is None: return dash.no_update
+        clicked_date = clickData['points'][0]['x'] if (callback_context.triggered and 'weekly' in callback_context.triggered[0]['prop_id'] and clickData) else date_picker_val
+        if not clicked_date: return None
+        try: return pack_facts(get_snapshot(clicked_date, user_data), user_data.get('company_id'))
+        except Exception: return None
+
+    clientside_callback(ClientsideFunction(namespace='attendance', function_name='interaction'),
+        Output('interaction-store', 'data'),
+        [Input('department-bar-graph', 'clickData'), Input('gender-bar-graph', 'clickData'),
+         Input('skills-bar-graph', 'clickData'), Input('shift-bar-graph', 'clickData'),
+         Input('btn-clear-filter', 'n_clicks')])
+
+    clientside_callback(ClientsideFunction(namespace='attendance', function_name='figures'),
+        [Output('department-bar-graph', 'figure'), Output('gender-bar-graph', 'figure'),
+         Output('skills-bar-graph', 'figure'), Output('shift-bar-graph', 'figure')],
+        [Input('crossfilter-facts-store', 'data'), Input('interaction-store', 'data')])
+
 # --- DRILL DOWN ---
 @callback(
-    [Output("details-offcanvas", "is_open"), Output("table-container", "children"), Output("details-offcanvas", "title"), Output("drilldown-store", "data")],
+    [Output("details-offcanvas", "is_open"), Output("details-offcanvas", "title"), Output("drilldown-store", "data"),
+     Output('drilldown-table', 'sort_by'), Output('drilldown-table', 'filter_query')],
     [Input("weekly-attendance-graph", "clickData"), Input('att-date', 'date'), Input('interaction-store', 'data'), Input('user-context-store', 'data')]
 )
 def unified_drilldown(weekly_click, date_picker_val, filter_data, user_data):
-    if user_data is None: return False, dash.no_update, dash.no_update, dash.no_update
+    closed = (False, dash.no_update, dash.no_update, dash.no_update, dash.no_update)
+    if user_data is None: return closed
     trigger_id = callback_context.triggered[0]['prop_id'].split('.')[0] if callback_context.triggered else None
     clicked_date = weekly_click['points'][0]['x'] if weekly_click else date_picker_val
-    if trigger_id == 'att-date' or not weekly_click: return False, dash.no_update, dash.no_update, dash.no_update
-    
-    plant_id, company_id, contractor_id, supervisor_id = user_data.get('plant_id'), user_data.get('company_id'), user_data.get('contractor_id'), user_data.get('empid')
-    _, where_clause = build_base_query(plant_id, company_id, None, contractor_id)
-    if supervisor_id: where_clause = (where_clause + f" AND e.parent_id = {supervisor_id}") if where_clause else f" WHERE e.parent_id = {supervisor_id}"
+    if trigger_id == 'att-date' or not weekly_click: return closed
     
-    extra = f" AND DATE(a.check_in) = '{clicked_date}'"
     header_text = f"Drill-Down: {clicked_date}"
-    if filter_data:
-        extra += f" AND {filter_data['col']} = '{filter_data['val']}'"
-        header_text += f" ({filter_data['val']})"
-    full_where = (where_clause + extra) if where_clause else f" WHERE 1=1 {extra}"
-
-    query = f"""
-    SELECT DISTINCT e.employee_code as "Code", e.name as "Name", 
-        COALESCE(d.name, 'Unknown') as "Department", COALESCE(s.name, 'Unknown') as "Shift", 
-        a.check_in as "Check In", a.check_out as "Check Out"
-    FROM hr_attendance a 
-    JOIN hr_employee e ON a.employee_id = e.id 
-    LEFT JOIN hr_department d ON e.department_id = d.id 
-    LEFT JOIN hr_job j ON e.job_id = j.id 
-    LEFT JOIN resource_calendar s ON a.assigned_shift_id = s.id 
-    LEFT JOIN plant_contractor c ON e.contractor_id = c.id
-    {full_where} ORDER BY "Check In" DESC LIMIT 500
-    """
+    cross_filter = filter_data if filter_data and filter_data.get('col') in CROSS_FILTER_COLUMNS else None
+    if cross_filter: header_text += f" ({cross_filter['val']})"
+
+    # Only the query spec is stored; drilldown-table fetches its pages on demand
+    return True, header_text, {'date': clicked_date, 'filter': cross_filter}, [], ''
+
+@callback(
+    [Output('drilldown-table', 'data'), Output('drilldown-table', 'page_count'), Output('drilldown-table', 'page_current'),
+     Output('drilldown-cursors', 'data'), Output('table-container', 'children')],
+    [Input('drilldown-store', 'data'), Input('drilldown-table', 'page_current'), Input('drilldown-table', 'sort_by'), Input('drilldown-table', 'filter_query')],
+    [State('drilldown-table', 'page_size'), State('drilldown-cursors', 'data'), State('user-context-store', 'data')]
+)
+def update_drilldown_page(spec, page, sort_by, filter_query, page_size, cursors, user_data):
+    if not spec or user_data is None: return [], 0, 0, {}, None
+
+    # Cursors (last key of each visited page) are only valid for the query that produced them
+    query_key = json.dumps([spec, sort_by, filter_query, user_data], sort_keys=True, default=str)
+    if not cursors or cursors.get('query') != query_key: cursors, page = {'query': query_key, 'pages': {}}, 0
+    page = page or 0
+
     try:
-        df_drill = pd.read_sql(query, db_connection)
-        if df_drill.empty: return True, dbc.Alert("No data found.", color="warning"), header_text, []
-        if 'Check In' in df_drill.columns: df_drill['Check In'] = pd.to_datetime(df_drill['Check In'], errors='coerce').dt.strftime('%Y-%m-%d %H:%M')
-        if 'Check Out' in df_drill.columns: df_drill['Check Out'] = pd.to_datetime(df_drill['Check Out'], errors='coerce').dt.strftime('%H:%M')
-        return True, dbc.Table.from_dataframe(df_drill.astype(object).fillna("N/A"), striped=True, bordered=True, hover=True, responsive=True), header_text, df_drill.to_dict('records')
-    except Exception as e: return True, dbc.Alert(f"Error: {e}", color="danger"), "Error", []
-
-@callback(Output("download-dataframe-pdf", "data"), Input("btn-download-pdf", "n_clicks"), State("drilldown-store", "data"), prevent_initial_call=True)
-def download_pdf(n_clicks, data):
-    if not n_clicks or not data: return dash.no_update
-    df_export = pd.DataFrame(data).astype(str); df_export.insert(0, "S.No", range(1, 1 + len(df_export)))
-    pdf = FPDF(orientation='L', unit='mm', format='A4'); pdf.add_page(); pdf.set_font("Arial", 'B', 14); pdf.cell(0, 10, txt="Attendance Report", ln=True, align='C'); pdf.ln(5); pdf.set_font("Arial", size=8)
-    cols = df_export.columns.tolist(); col_w = [10, 60, 50, 40, 40, 40]
-    for i, col in enumerate(cols): pdf.cell(col_w[i] if i < len(col_w) else 30, 10, col[:15], border=1, align='C')
-    pdf.ln()
-    for index, row in df_export.iterrows():
-        for i, item in enumerate(row): pdf.cell(col_w[i] if i < len(col_w) else 30, 8, item[:20], border=1, align='C')
-        pdf.ln()
-    def to_output(file_obj): file_obj.write(pdf.output(dest='S').encode('latin-1'))
-    return dcc.send_bytes(to_output, "attendance_report.pdf")
-
-@callback(Output("download-dataframe-csv", "data"), Input("btn-download", "n_clicks"), State("drilldown-store", "data"), prevent_initial_call=True)
-def download_csv(n_clicks, data):
-    if not n_clicks or not data: return dash.no_update
-    df_export = pd.DataFrame(data); df_export.insert(0, "S.No", range(1, 1 + len(df_export)))
-    return dcc.send_data_frame(df_export.to_csv, filename="attendance_drilldown.csv", index=False)
+        filters = drilldown_filters(spec, user_data, filter_query)
+        total = int(read_sql(DRILLDOWN_COUNT, where=filters)['n'].iloc[0])
+        if not total: return [], 0, 0, cursors, dbc.Alert("No data found.", color="warning")
+
+        # Keyset seek when the previous page was visited, OFFSET for direct jumps
+        keys, descending = drilldown_order(sort_by)
+        df, next_cursor = read_page(DRILLDOWN, keys, descending, after=cursors['pages'].get(str(page)), page=page, page_size=page_size, where=filters)
+        if next_cursor: cursors['pages'][str(page + 1)] = next_cursor
+        rows = format_drilldown(df).astype(object).fillna("N/A").to_dict('records')
+        return rows, math.ceil(total / page_size), page, cursors, f"{total:,} records"
+    except Exception as e: return [], 0, 0, cursors, dbc.Alert(f"Error: {e}", color="danger")
+
+# PDF is rendered by a background job (jobs.py); job_panel shows progress and the download link
+@callback(Output({'type': 'job-store', 'name': 'attendance-pdf'}, 'data'), Input("btn-download-pdf", "n_clicks"),
+          [State("drilldown-store", "data"), State('user-context-store', 'data'), State('drilldown-table', 'sort_by'), State('drilldown-table', 'filter_query')], prevent_initial_call=True)
+def download_pdf(n_clicks, spec, user_data, sort_by, filter_query):
+    if not n_clicks or not spec or not user_data or not user_data.get('empid'): return dash.no_update
+    return submit("attendance_report.pdf", user_data['empid'], attendance_pdf, spec, user_data, sort_by, filter_query)
+
+# CSV is streamed by exports.py straight from the database
+@callback(Output("btn-download", "href"),
+          [Input("drilldown-store", "data"), Input('user-context-store', 'data'), Input('drilldown-table', 'sort_by'), Input('drilldown-table', 'filter_query')])
+def update_csv_link(spec, user_data, sort_by, filter_query):
+    if not spec or not user_data or not user_data.get('empid'): return None
+    cross_filter = spec.get('filter') or {}
+    sort = (sort_by or [{}])[0]
+    return export_url('attendance', user_data, date=spec['date'], col=cross_filter.get('col'), val=cross_filter.get('val'),
+                      sort=sort.get('column_id'), dir=sort.get('direction'), filter=filter_query)
@@ -1,18 +1,17 @@
 import dash
-from dash import dcc, html, Input, Output, State, callback, callback_context, no_update
+from dash import dcc, html, Input, Output, State, callback
 import dash_bootstrap_components as dbc
-import pandas as pd
 from datetime import date
-from fpdf import FPDF
-import numpy as np
-from utils import db_connection, render_info_tooltip, create_user_status_widget, get_supervisor_counts
+from utils import (read_sql, create_user_status_widget, mandays_filters, mandays_per_employee, summarize_mandays,
+                   read_mandays_summary, read_mandays_ledger, mandays_view_range, MANDAYS_ENGINE, MANDAYS_VIEWS)
+from kpi import get_supervisor_counts
+from exports import export_url, mandays_pdf
+from jobs import submit, job_panel
 
 dash.register_page(__name__, path='/mandays', name='Man Days')
 
 layout = dbc.Container([
     dcc.Store(id='md-data-store'),
-    dcc.Download(id="md-download-csv"),
-    dcc.Download(id="md-download-pdf"),
 
     # Header
     html.H3([html.I(className="fa-solid fa-table-list me-2"), "Man Days Details"], className="mb-4 text-primary fw-bold"),
@@ -32,6 +31,10 @@ layout = dbc.Container([
                 max_date_allowed=date(2030, 12, 31),
                 display_format='Y-MM-DD',
                 className="d-block w-100 shadow-sm"
+            ),
+            dbc.RadioItems(
+                id='md-view', value='day', inline=True, className="small mt-2",
+                options=[{'label': label, 'value': value} for value, label in MANDAYS_VIEWS.items()]
             )
         ], width=4),
 
@@ -54,8 +57,9 @@ layout = dbc.Container([
 
         # Action Buttons
         dbc.Col([
-            dbc.Button([html.I(className="fa-solid fa-file-csv me-2"), "Export CSV"], id="md-btn-csv", color="success", size="sm", className="w-100 mb-2 shadow-sm"),
+            dbc.Button([html.I(className="fa-solid fa-file-csv me-2"), "Export CSV"], id="md-btn-csv", color="success", size="sm", className="w-100 mb-2 shadow-sm", external_link=True),
             dbc.Button([html.I(className="fa-solid fa-file-pdf me-2"), "Export PDF"], id="md-btn-pdf", color="danger", size="sm", className="w-100 shadow-sm"),
+            job_panel('mandays-pdf'),
         ], width=4),
 
     ], className="mb-4 align-items-end"),
@@ -63,6 +67,7 @@ layout = dbc.Container([
     # --- DATA TABLE CARD ---
     dbc.Card([
         dbc.CardBody([
+            html.Div(dbc.Progress(id='md-progress', value=0, striped=True, animated=True, className="mb-3"), id='md-progress-wrap', style={'display': 'none'}),
             dcc.Loading(html.Div(id='mandays-table-container', style={'overflowX': 'auto'}))
         ])
     ], className="shadow-sm border-0")
@@ -96,13 +101,17 @@ def load_date_from_store(stored_date):
 @callback(
     Output('md-status-widget', 'children'), 
     [Input('user-context-store', 'data'),
-     Input('md-date', 'date')]
+     Input('md-date', 'date'),
+     Input('md-view', 'value')]
 )
-def update_mandays_widget(user_data, selected_date):
+def update_mandays_widget(user_data, selected_date, view):
     if user_data is None: return dash.no_update
     emp_name = user_data.get('emp_name', 'Unknown')
     contractor = user_data.get('contractor_name', None)
     date_display = str(selected_date) if selected_date else "Select Date"
+    if selected_date and view in ('mtd', 'month'):
+        start, end, _ = mandays_view_range(selected_date, view)
+        date_display = f"{start} to {end}"
     return create_user_status_widget(emp_name, contractor, date_display)
 
 # --- SUPERVISOR KPI CALLBACK ---
@@ -118,121 +127,59 @@ def update_md_supervisor_kpi(selected_date, user_data):
 
     return get_supervisor_counts(supervisor_id, selected_date, company_id, plant_id, contractor_id)
 
+# (header, column, bold) per table column; month views show employee-days and utilisation
+DAY_TABLE_COLUMNS = [
+    ("Shift", 'Shift', True), ("Department", 'Department', False), ("Total Emp", 'Total_Emp', False),
+    ("Std Hrs Emp", 'Std_Emp', False), ("Early Exit", 'Early_Emp', False), ("Extra Hrs Emp", 'Extra_Emp', False),
+    ("Extra Hours", 'Sum_Extra_Hrs', False), ("Extra Hrs MD", 'Extra_MD', True), ("Good Hrs Emp", 'Good_Emp', False),
+    ("Good Hrs MD", 'Good_MD', True), ("OT Man Days", 'OT_MD', True)
+]
+MONTH_TABLE_COLUMNS = DAY_TABLE_COLUMNS[:2] + [("Emp Days", 'Emp_Days', True), ("Peak Emp", 'Peak_Emp', False)] + DAY_TABLE_COLUMNS[3:] + [("Utilisation %", 'Utilisation', True)]
+
 # 2. GENERATE TABLE (UPDATED QUERY)
+# Runs as a background callback: picking another date replaces (cancels) the running job,
+# leaving the page cancels it too
 @callback(
     [Output('mandays-table-container', 'children'),
      Output('md-data-store', 'data')],
     [Input('md-date', 'date'), 
-     Input('user-context-store', 'data')] 
+     Input('user-context-store', 'data'),
+     Input('md-view', 'value')],
+    background=True,
+    running=[(Output('md-progress-wrap', 'style'), {'display': 'block'}, {'display': 'none'})],
+    progress=[Output('md-progress', 'value'), Output('md-progress', 'label')],
+    cancel=[Input('url', 'pathname')]
 )
-def update_table(selected_date, user_data):
+def update_table(set_progress, selected_date, user_data, view):
     if user_data is None: return html.Div("Loading...", className="text-muted p-3"), []
+    set_progress((10, "Querying attendance"))
 
-    plant_id = user_data.get('plant_id') if user_data else None
-    company_id = user_data.get('company_id') if user_data else None
-    contractor_id = user_data.get('contractor_id') if user_data else None
-    supervisor_id = user_data.get('empid')
-
-    conds = ["e.active = true"]
-    if company_id: conds.append(f"e.company_id = {company_id}")
-    if plant_id: conds.append(f"e.plant_id = {plant_id}")
-    if contractor_id: conds.append(f"e.contractor_id = {contractor_id}")
-    
-    # FILTER: Add Supervisor Scope
-    if supervisor_id: conds.append(f"e.parent_id = {supervisor_id}")
-    
-    date_cond = ""
-    if selected_date:
-        date_cond = f"AND DATE(a.check_in) = '{selected_date}'"
-
-    where_sql = "WHERE " + " AND ".join(conds) if conds else "WHERE 1=1"
-
-    # --- UPDATE: Using assigned_shift_id for accuracy ---
-    query = f"""
-    SELECT 
-        COALESCE(s.name, 'No Shift') as "Shift",
-        COALESCE(d.name, 'Unknown') as "Department",
-        e.id as emp_id,
-        COALESCE(s.hours_per_day, 8) as std_hours,
-        EXTRACT(EPOCH FROM (a.check_out - a.check_in))/3600 as worked_hours
-    FROM hr_attendance a
-    JOIN hr_employee e ON a.employee_id = e.id
-    LEFT JOIN resource_calendar s ON a.assigned_shift_id = s.id 
-    LEFT JOIN hr_department d ON e.department_id = d.id
-    LEFT JOIN hr_job j ON e.job_id = j.id
-    {where_sql} {date_cond} AND a.check_out IS NOT NULL
-    """
-    
     try:
-        df = pd.read_sql(query, db_connection)
-        
-        if df.empty:
+        if view in ('mtd', 'month') and selected_date:
+            # Month views sum the per-day man-days ledger
+            grouped = read_mandays_ledger(user_data, *mandays_view_range(selected_date, view))
+        elif MANDAYS_ENGINE == 'sql':
+            # The database returns the summary rows directly
+            grouped = read_mandays_summary(user_data, selected_date)
+        else:
+            # --- UPDATE: Using assigned_shift_id for accuracy ---
+            statement, filters = mandays_filters(user_data, selected_date)
+            df = read_sql(statement, where=filters)
+
+            # --- DATA PROCESSING ---
+            set_progress((60, "Calculating man-days"))
+            grouped = summarize_mandays(mandays_per_employee(df)) if not df.empty else None
+
+        if grouped is None:
             return dbc.Alert("No data found for this date.", color="warning"), []
+        set_progress((90, "Building table"))
 
-        # --- DATA PROCESSING ---
-        df['is_standard'] = df['worked_hours'] >= df['std_hours']
-        df['is_early'] = df['worked_hours'] < df['std_hours']
-        df['diff'] = df['worked_hours'] - df['std_hours']
-        df['diff_floor'] = np.floor(df['diff'])
-        
-        df['is_extra'] = (df['diff'] > 0) & (df['diff'] <= 3.5) & (df['diff_floor'] >= 1)
-        df['val_extra'] = np.where(df['is_extra'], df['diff_floor'], 0)
-
-        df['good_raw'] = df['diff'] - 3.5
-        df['good_floor'] = np.floor(df['good_raw'])
-        df['is_good'] = df['good_raw'] > 0
-        df['val_good'] = np.where(df['is_good'], df['good_floor'], 0)
-
-        df['ot_raw'] = np.floor(df['diff'])
-        df['val_ot'] = np.where(df['ot_raw'] > 0, df['ot_raw'], 0)
-
-        grouped = df.groupby(['Shift', 'Department', 'std_hours']).agg(
-            Total_Emp=('emp_id', 'nunique'),
-            Std_Emp=('is_standard', 'sum'),
-            Early_Emp=('is_early', 'sum'),
-            Extra_Emp=('is_extra', 'sum'),
-            Sum_Extra_Hrs=('val_extra', 'sum'), 
-            Good_Emp=('is_good', 'sum'),
-            Sum_Good_Hrs=('val_good', 'sum'), 
-            Sum_OT_Hrs=('val_ot', 'sum')
-        ).reset_index()
-
-        grouped['Extra_MD'] = (grouped['Sum_Extra_Hrs'] / grouped['std_hours']).round(2)
-        grouped['Good_MD'] = (grouped['Sum_Good_Hrs'] / grouped['std_hours']).round(2)
-        grouped['OT_MD'] = (grouped['Sum_OT_Hrs'] / grouped['std_hours']).round(2)
-        
-        grouped.sort_values(['Shift', 'Department'], inplace=True)
-        
-        table_header = [
-            html.Tr([
-                html.Th("Shift"), html.Th("Department"),
-                html.Th("Total Emp"),
-                html.Th("Std Hrs Emp"),
-                html.Th("Early Exit"),
-                html.Th("Extra Hrs Emp"),
-                html.Th("Extra Hours"), 
-                html.Th("Extra Hrs MD"),
-                html.Th("Good Hrs Emp"),
-                html.Th("Good Hrs MD"),
-                html.Th("OT Man Days")
-            ])
-        ]
+        columns = MONTH_TABLE_COLUMNS if 'Emp_Days' in grouped else DAY_TABLE_COLUMNS
+        table_header = [html.Tr([html.Th(header) for header, _, _ in columns])]
 
         table_rows = []
         for _, row in grouped.iterrows():
-            table_rows.append(html.Tr([
-                html.Td(row['Shift'], className="fw-bold"),
-                html.Td(row['Department']),
-                html.Td(row['Total_Emp']),
-                html.Td(row['Std_Emp']),
-                html.Td(row['Early_Emp']),
-                html.Td(row['Extra_Emp']),
-                html.Td(row['Sum_Extra_Hrs']), 
-                html.Td(row['Extra_MD'], className="fw-bold"),
-                html.Td(row['Good_Emp']),
-                html.Td(row['Good_MD'], className="fw-bold"),
-                html.Td(row['OT_MD'], className="fw-bold")
-            ]))
+            table_rows.append(html.Tr([html.Td(row[col], className="fw-bold" if bold else None) for _, col, bold in columns]))
 
         table = dbc.Table([html.Thead(table_header), html.Tbody(table_rows)], 
                           bordered=True, hover=True, striped=True, size='sm')
@@ -242,37 +189,15 @@ def update_table(selected_date, user_data):
     except Exception as e:
         return dbc.Alert(f"Error processing data: {e}", color="danger"), []
 
-@callback(Output("md-download-csv", "data"), Input("md-btn-csv", "n_clicks"), State("md-data-store", "data"), prevent_initial_call=True)
-def download_csv(n, data):
-    if not n or not data: return dash.no_update
-    return dcc.send_data_frame(pd.DataFrame(data).to_csv, filename="mandays_report.csv", index=False)
-
-@callback(Output("md-download-pdf", "data"), Input("md-btn-pdf", "n_clicks"), State("md-data-store", "data"), prevent_initial_call=True)
-def download_pdf(n, data):
-    if not n or not data: return dash.no_update
-    
-    df = pd.DataFrame(data)
-    pdf = FPDF(orientation='L', unit='mm', format='A4')
-    pdf.add_page()
-    pdf.set_font("Arial", 'B', 14)
-    pdf.cell(0, 10, "Man Days Detailed Report", ln=True, align='C')
-    pdf.ln(5)
-    pdf.set_font("Arial", size=8)
-    
-    # Updated Columns List for PDF
-    cols = ['Shift', 'Department', 'Total_Emp', 'Std_Emp', 'Early_Emp', 'Extra_Emp', 'Sum_Extra_Hrs', 'Extra_MD', 'Good_Emp', 'Good_MD', 'OT_MD']
-    # Updated Widths (added 20 for the new column)
-    col_w = [20, 45, 18, 18, 18, 18, 20, 18, 18, 18, 18]
-    
-    for i, col in enumerate(cols):
-        # Shorten header for PDF if needed
-        header_text = "Ex. Hrs" if col == 'Sum_Extra_Hrs' else col[:12]
-        pdf.cell(col_w[i], 8, header_text, border=1, align='C')
-    pdf.ln()
-    for _, row in df.iterrows():
-        for i, col in enumerate(cols):
-            val = str(row.get(col, '-'))
-            pdf.cell(col_w[i], 8, val[:25], border=1, align='C')
-        pdf.ln()
-    def to_output(file_obj): pdf_string = pdf.output(dest='S'); file_obj.write(pdf_string.encode('latin-1'))
-    return dcc.send_bytes(to_output, "mandays_report.pdf")
+# CSV is streamed by exports.py straight from the database
+@callback(Output("md-btn-csv", "href"), [Input('md-date', 'date'), Input('user-context-store', 'data'), Input('md-view', 'value')])
+def update_csv_link(selected_date, user_data, view):
+    if not user_data or not user_data.get('empid'): return None
+    return export_url('mandays', user_data, date=selected_date, view=view)
+
+# PDF is rendered by a background job (jobs.py); job_panel shows progress and the download link
+@callback(Output({'type': 'job-store', 'name': 'mandays-pdf'}, 'data'), Input("md-btn-pdf", "n_clicks"),
+          [State('md-date', 'date'), State('user-context-store', 'data'), State('md-view', 'value')], prevent_initial_call=True)
+def download_pdf(n, selected_date, user_data, view):
+    if not n or not user_data or not user_data.get('empid'): return dash.no_update
+    return submit("mandays_report.pdf", user_data['empid'], mandays_pdf, user_data, selected_date, view)
@@ -0,0 +1,523 @@
+import hashlib
+import re
+from datetime import timedelta
+import pandas as pd
+
+# ---------------------------------------------------------
+# 1. FILTER BUILDER
+# ---------------------------------------------------------
+
+# Columns the Attendance page may cross-filter on through `interaction-store`,
+# mapped to their SQL expressions. Anything else is ignored.
+CROSS_FILTER_COLUMNS = {
+    'dept_name': "COALESCE(d.name, 'Unknown')",
+    'gender': "COALESCE(e.gender, 'Unknown')",
+    'skills': "COALESCE(e.skills_status, 'Unknown')",
+    'shift': "COALESCE(s.name, 'Unknown')",
+}
+
+# DataTable custom-filter operators (filter_query) mapped to SQL; values are bound
+# as text and compared against text expressions. 'i'/'s' prefixed variants
+# (icontains, seq, ...) are folded onto these.
+GRID_OPERATORS = {
+    'contains': 'ILIKE', 'datestartswith': 'LIKE',
+    '=': '=', 'eq': '=', '!=': '<>', 'ne': '<>',
+    '<': '<', 'lt': '<', '<=': '<=', 'le': '<=', '>': '>', 'gt': '>', '>=': '>=', 'ge': '>=',
+}
+
+def escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def day_bounds(start_date, end_date=None):
+    """Half-open [start, end + 1 day) bounds for an inclusive date range."""
+    start = pd.to_datetime(start_date).date()
+    end = pd.to_datetime(end_date).date() if end_date else start
+    return start, end + timedelta(days=1)
+
+class Filters:
+    """
+    WHERE-clause builder. Values always travel as bound parameters, so the SQL
+    text only depends on which filters are present, never on their values.
+    """
+
+    def __init__(self, *conditions):
+        self.conditions = list(conditions)
+        self.params = {}
+
+    def add(self, condition, **params):
+        self.conditions.append(condition)
+        self.params.update(params)
+        return self
+
+    def scope(self, company_id=None, plant_id=None, contractor_id=None, supervisor_id=None, emp_type=None, alias='e', active=True):
+        col = lambda name: f"{alias}.{name}" if alias else name
+        if active: self.add(f"{col('active')} = true")
+        if company_id: self.add(f"{col('company_id')} = :company_id", company_id=int(company_id))
+        if plant_id: self.add(f"{col('plant_id')} = :plant_id", plant_id=int(plant_id))
+        if emp_type: self.add(f"LOWER({col('employee_type')}) = LOWER(:emp_type)", emp_type=str(emp_type))
+        if contractor_id: self.add(f"{col('contractor_id')} = :contractor_id", contractor_id=int(contractor_id))
+        if supervisor_id: self.add(f"{col('parent_id')} = :supervisor_id", supervisor_id=int(supervisor_id))
+        return self
+
+    def user_scope(self, user_data, alias='e', active=True):
+        return self.scope(user_data.get('company_id'), user_data.get('plant_id'), user_data.get('contractor_id'), user_data.get('empid'), alias=alias, active=active)
+
+    def date_range(self, start_date, end_date=None, column='a.check_in'):
+        # Half-open range instead of DATE(column) = ... so a btree on the column is usable
+        start, end = day_bounds(start_date, end_date)
+        return self.add(f"{column} >= :range_start AND {column} < :range_end", range_start=start, range_end=end)
+
+    def cross_filter(self, filter_data, skip_source=None):
+        if not filter_data or filter_data.get('source') == skip_source: return self
+        expr = CROSS_FILTER_COLUMNS.get(filter_data.get('col'))
+        if expr: self.add(f"{expr} = :xf_val", xf_val=str(filter_data['val']))
+        return self
+
+    def grid_filter(self, filter_query, columns):
+        """
+        DataTable `filter_query` (filter_action='custom'), e.g. `{Name} contains "ra" && {Shift} = A`.
+        Only columns in `columns` (display name -> text SQL expression) and known
+        operators are applied; anything else is ignored.
+        """
+        for i, clause in enumerate(c for c in (filter_query or '').split(' && ') if c.strip()):
+            match = re.match(r'\s*\{(.+?)\}\s+(\S+)\s+(.*?)\s*$', clause)
+            if not match or match[1] not in columns: continue
+            op = match[2]
+            if op not in GRID_OPERATORS and op[:1] in ('i', 's'): op = op[1:]
+            if op not in GRID_OPERATORS: continue
+            value = match[3]
+            if len(value) >= 2 and value[0] == value[-1] and value[0] in '"\'`':
+                value = re.sub(r'\\(.)', r'\1', value[1:-1])
+            if op == 'contains': value = f"%{escape_like(value)}%"
+            elif op == 'datestartswith': value = f"{escape_like(value)}%"
+            self.add(f"{columns[match[1]]} {GRID_OPERATORS[op]} :grid_{i}", **{f'grid_{i}': value})
+        return self
+
+    def sql(self):
+        return " AND ".join(self.conditions) if self.conditions else "TRUE"
+
+# ---------------------------------------------------------
+# 2. NAMED STATEMENTS
+# ---------------------------------------------------------
+
+class Statement:
+    """
+    A named SQL template. `{slot}` placeholders are filled with Filters (their
+    conditions and parameters are merged) or with trusted SQL fragments.
+    """
+
+    def __init__(self, name, sql):
+        self.name = name
+        self.sql = sql
+
+    def bind(self, params=None, **fragments):
+        bound = {}
+        rendered = {}
+        for slot, value in fragments.items():
+            if isinstance(value, Filters):
+                rendered[slot] = value.sql()
+                bound.update(value.params)
+            else:
+                rendered[slot] = value
+        bound.update(params or {})
+        sql = self.sql.format(**rendered) if rendered else self.sql
+        return BoundQuery(self.name, sql, bound)
+
+class BoundQuery:
+    def __init__(self, name, sql, params):
+        self.name = name
+        self.sql = sql
+        self.params = params
+
+    @property
+    def shape_name(self):
+        # One server-side prepared statement per distinct SQL text of a named statement
+        digest = hashlib.md5(re.sub(r'\s+', ' ', self.sql).strip().encode()).hexdigest()[:10]
+        return f"{self.name or 'q'}_{digest}"
+
+ATTENDANCE_WATERMARK = Statement('attendance_watermark', """
+    SELECT MAX(id) as max_id, MAX(write_date) as max_write_date FROM hr_attendance
+""")
+
+# Reference tables held in memory by utils.reference_data (small, rarely changed)
+REFERENCE_DATA = {
+    'plants': Statement('ref_plants', "SELECT id, location, plant_code FROM plant_plant ORDER BY id"),
+    'companies': Statement('ref_companies', "SELECT DISTINCT company_id AS id FROM hr_employee WHERE company_id IS NOT NULL ORDER BY 1"),
+    'departments': Statement('ref_departments', "SELECT id, name FROM hr_department"),
+    'shifts': Statement('ref_shifts', "SELECT id, name, active, company_id FROM resource_calendar"),
+    'contractors': Statement('ref_contractors', "SELECT id, contractor_name AS name FROM plant_contractor"),
+}
+
+USER_CONTEXT = Statement('user_context', """
+    SELECT e.id, e.name, e.company_id, e.plant_id, e.contractor_id
+    FROM hr_employee e
+    WHERE e.id = :empid AND e.active = true
+""")
+
+ATTENDANCE_SNAPSHOT = Statement('attendance_snapshot', """
+    WITH first_swipes AS (
+        SELECT DISTINCT ON (a.employee_id) a.employee_id, a.assigned_shift_id
+        FROM hr_attendance a
+        JOIN hr_employee e ON a.employee_id = e.id
+        WHERE {where}
+        ORDER BY a.employee_id, a.check_in ASC
+    )
+    SELECT fs.employee_id, e.department_id,
+        COALESCE(e.gender, 'Unknown') as gender,
+        COALESCE(e.skills_status, 'Unknown') as skills,
+        fs.assigned_shift_id as shift_id, e.contractor_id
+    FROM first_swipes fs
+    JOIN hr_employee e ON fs.employee_id = e.id
+""")
+
+DAILY_PRESENT_COUNTS = Statement('daily_present', """
+    SELECT DATE(a.check_in) as day, COUNT(DISTINCT a.employee_id) as present
+    FROM hr_attendance a
+    JOIN hr_employee e ON a.employee_id = e.id
+    WHERE {where}
+    GROUP BY 1
+""")
+
+# Present counts per supervisor (e.parent_id) and day, for batch KPI lookups (kpi.py)
+SUPERVISOR_DAILY_PRESENT_COUNTS = Statement('supervisor_daily_present', """
+    SELECT e.parent_id as supervisor_id, DATE(a.check_in) as day, COUNT(DISTINCT a.employee_id) as present
+    FROM hr_attendance a
+    JOIN hr_employee e ON a.employee_id = e.id
+    WHERE {where}
+    GROUP BY 1, 2
+""")
+
+# Drill-down grid columns: display name -> (sort expression, filter expression).
+# Sort expressions are never NULL so they can take part in keyset comparisons
+# (open sessions sort as a far-future check-out that survives the round trip).
+DRILLDOWN_COLUMNS = {
+    'Code': ("COALESCE(e.employee_code, '')", "COALESCE(e.employee_code, '')"),
+    'Name': ("COALESCE(e.name, '')", "COALESCE(e.name, '')"),
+    'Department': ("COALESCE(d.name, 'Unknown')", "COALESCE(d.name, 'Unknown')"),
+    'Shift': ("COALESCE(s.name, 'Unknown')", "COALESCE(s.name, 'Unknown')"),
+    'Check In': ("a.check_in", "CAST(a.check_in AS text)"),
+    'Check Out': ("COALESCE(a.check_out, CAST('9999-12-31' AS timestamp))", "COALESCE(CAST(a.check_out AS text), '')"),
+}
+
+# Unique row order used as the keyset tail: (check_in, employee_id), with the
+# attendance id breaking exact duplicates
+DRILLDOWN_TIEBREAK = ['a.check_in', 'a.employee_id', 'a.id']
+
+_DRILLDOWN_FROM = """
+    FROM hr_attendance a
+    JOIN hr_employee e ON a.employee_id = e.id
+    LEFT JOIN hr_department d ON e.department_id = d.id
+    LEFT JOIN hr_job j ON e.job_id = j.id
+    LEFT JOIN resource_calendar s ON a.assigned_shift_id = s.id
+    LEFT JOIN plant_contractor c ON e.contractor_id = c.id
+"""
+
+# {keys}, {order} and {page} are filled by utils.read_page (or with '' / an ORDER BY for full exports)
+DRILLDOWN = Statement('drilldown', """
+    SELECT e.employee_code as "Code", e.name as "Name",
+        COALESCE(d.name, 'Unknown') as "Department", COALESCE(s.name, 'Unknown') as "Shift",
+        a.check_in as "Check In", a.check_out as "Check Out"{keys}
+""" + _DRILLDOWN_FROM + """
+    WHERE {where}
+    ORDER BY {order} {page}
+""")
+
+DRILLDOWN_COUNT = Statement('drilldown_count', "SELECT COUNT(*) as n" + _DRILLDOWN_FROM + "WHERE {where}")
+
+def drilldown_filters(spec, user_data, filter_query=None):
+    """Drill-down rows for a drilldown-store spec ({'date', optional 'end', 'filter'}) in the user's scope."""
+    filters = Filters().user_scope(user_data).date_range(spec['date'], spec.get('end')).cross_filter(spec.get('filter'))
+    return filters.grid_filter(filter_query, {col: exprs[1] for col, exprs in DRILLDOWN_COLUMNS.items()})
+
+def drilldown_order(sort_by):
+    """Keyset expressions and direction for a DataTable `sort_by` (single-column sort)."""
+    sort = (sort_by or [{}])[0]
+    column = DRILLDOWN_COLUMNS.get(sort.get('column_id'))
+    descending = sort.get('direction', 'desc') == 'desc' if column else True
+    keys = [column[0]] if column and column[0] not in DRILLDOWN_TIEBREAK else []
+    return keys + DRILLDOWN_TIEBREAK, descending
+
+MISSED_CHECKOUTS = Statement('missed_checkouts', """
+    SELECT DATE(a.check_in) as "Date", e.name as "Name", e.employee_code as "Employee Code"
+    FROM hr_attendance a LEFT JOIN hr_employee e ON a.employee_id = e.id
+    WHERE a.check_out IS NULL AND {where}
+    ORDER BY a.check_in DESC LIMIT 50
+""")
+
+MULTIPLE_CHECKINS = Statement('multiple_checkins', """
+    SELECT DATE(a.check_in) as "Date", e.name as "Name", e.employee_code as "Employee Code", COUNT(*) as "Count"
+    FROM hr_attendance a LEFT JOIN hr_employee e ON a.employee_id = e.id
+    WHERE {where}
+    GROUP BY a.employee_id, DATE(a.check_in), e.name, e.employee_code
+    HAVING COUNT(*) > 1
+    ORDER BY "Date" DESC LIMIT 50
+""")
+
+# Date-range anomaly mode: one range-bounded scan grouped by employee and day.
+# {scan} takes the scope and date range; {where} filters the employee-days.
+_ANOMALY_EMPLOYEE_DAYS = """(
+        SELECT a.employee_id, DATE(a.check_in) as day, COUNT(*) as swipes,
+            COUNT(*) FILTER (WHERE a.check_out IS NULL) as open_sessions
+        FROM hr_attendance a JOIN hr_employee e ON a.employee_id = e.id
+        WHERE {scan}
+        GROUP BY a.employee_id, DATE(a.check_in)
+    ) g"""
+
+# Per-day anomaly counts (missed check-out / multiple check-in employee-days) for the sparkline and totals
+ANOMALY_DAILY_COUNTS = Statement('anomaly_daily_counts', """
+    SELECT g.day, COUNT(*) FILTER (WHERE g.open_sessions > 0) as missed, COUNT(*) FILTER (WHERE g.swipes > 1) as multi
+    FROM """ + _ANOMALY_EMPLOYEE_DAYS + """
+    GROUP BY g.day ORDER BY g.day
+""")
+
+# Anomalous employee-days; {keys}, {order} and {page} are filled by utils.read_page
+ANOMALY_EMPLOYEE_DAYS = Statement('anomaly_employee_days', """
+    SELECT g.day as "Date", e.name as "Name", e.employee_code as "Employee Code",
+        g.swipes as "Check-Ins", g.open_sessions as "Open"{keys}
+    FROM """ + _ANOMALY_EMPLOYEE_DAYS + """
+    JOIN hr_employee e ON g.employee_id = e.id
+    WHERE {where}
+    ORDER BY {order} {page}
+""")
+
+ANOMALY_KINDS = {'missed': "g.open_sessions > 0", 'multi': "g.swipes > 1"}
+ANOMALY_PAGE_KEYS = ['g.day', 'g.employee_id']
+
+# Master-data gap category -> condition on hr_employee (backed by the partial
+# indexes of migrations/0004_employee_gap_indexes.sql)
+MASTER_DATA_GAP_CATEGORIES = {
+    'skills': "skills_status IS NULL",
+    'contractor': "contractor_id IS NULL",
+    'job_position': "job_position IS NULL",
+    'department': "department_id IS NULL",
+}
+
+def _gap_values(expr):
+    return ", ".join(f"('{category}', {expr.format(category=category)})" for category in MASTER_DATA_GAP_CATEGORIES)
+
+# All gap categories in one scan of the scoped employees: exact per-category
+# totals via COUNT(*) FILTER and the newest :limit rows of each category. Every
+# category yields at least one row (NULL employee columns when it is clean).
+MASTER_DATA_GAPS = Statement('master_data_gaps', f"""
+    WITH gaps AS (
+        SELECT id, create_date, name, employee_code,
+            {", ".join(f"{cond} AS gap_{category}" for category, cond in MASTER_DATA_GAP_CATEGORIES.items())}
+        FROM hr_employee
+        WHERE {{where}} AND ({" OR ".join(MASTER_DATA_GAP_CATEGORIES.values())})
+    ),
+    totals AS (
+        SELECT {", ".join(f"COUNT(*) FILTER (WHERE gap_{category}) AS {category}" for category in MASTER_DATA_GAP_CATEGORIES)}
+        FROM gaps
+    ),
+    ranked AS (
+        SELECT c.category, g.create_date, g.name, g.employee_code,
+            row_number() OVER (PARTITION BY c.category ORDER BY g.create_date DESC NULLS FIRST, g.id DESC) AS rn
+        FROM gaps g CROSS JOIN LATERAL (VALUES {_gap_values("g.gap_{category}")}) AS c(category, hit)
+        WHERE c.hit
+    )
+    SELECT t.category, t.total, r.rn, r.create_date, r.name as "Name", r.employee_code as "Employee Code"
+    FROM totals CROSS JOIN LATERAL (VALUES {_gap_values("totals.{category}")}) AS t(category, total)
+    LEFT JOIN ranked r ON r.category = t.category AND r.rn <= :limit
+    ORDER BY t.category, r.rn
+""")
+
+MANDAYS_ROWS = Statement('mandays_rows', """
+    SELECT
+        COALESCE(s.name, 'No Shift') as "Shift",
+        COALESCE(d.name, 'Unknown') as "Department",
+        e.id as emp_id,
+        COALESCE(s.hours_per_day, 8) as std_hours,
+        EXTRACT(EPOCH FROM (a.check_out - a.check_in))/3600 as worked_hours
+    FROM hr_attendance a
+    JOIN hr_employee e ON a.employee_id = e.id
+    LEFT JOIN resource_calendar s ON a.assigned_shift_id = s.id
+    LEFT JOIN hr_department d ON e.department_id = d.id
+    LEFT JOIN hr_job j ON e.job_id = j.id
+    WHERE {where} AND a.check_out IS NOT NULL
+""")
+
+# Man-days measures over rows with `m.diff` = worked - standard hours, as in
+# utils.mandays_per_employee. Hours are compared as double precision, exactly
+# like the pandas path. All measures are additive across groups and days.
+MANDAYS_MEASURES = {
+    'Std_Emp': "COUNT(*) FILTER (WHERE m.diff >= 0)",
+    'Early_Emp': "COUNT(*) FILTER (WHERE m.diff < 0)",
+    'Extra_Emp': "COUNT(*) FILTER (WHERE m.diff > 0 AND m.diff <= 3.5 AND FLOOR(m.diff) >= 1)",
+    'Sum_Extra_Hrs': "COALESCE(SUM(FLOOR(m.diff)) FILTER (WHERE m.diff > 0 AND m.diff <= 3.5 AND FLOOR(m.diff) >= 1), 0)",
+    'Good_Emp': "COUNT(*) FILTER (WHERE m.diff - 3.5 > 0)",
+    'Sum_Good_Hrs': "COALESCE(SUM(FLOOR(m.diff - 3.5)) FILTER (WHERE m.diff - 3.5 > 0), 0)",
+    'Sum_OT_Hrs': "COALESCE(SUM(FLOOR(m.diff)) FILTER (WHERE FLOOR(m.diff) > 0), 0)",
+}
+
+# The man-days summary of utils.summarize_mandays(mandays_per_employee(rows)),
+# aggregated in the database over the rows of a MANDAYS_ROWS-shaped statement.
+# The man-day ratios and the final ordering are left to utils.read_mandays_summary.
+_MANDAYS_SUMMARY = """
+    SELECT m."Shift", m."Department", m.std_hours,
+        COUNT(DISTINCT m.emp_id) as "Total_Emp",
+        """ + ",\n        ".join(f'{expr} as "{name}"' for name, expr in MANDAYS_MEASURES.items()) + """
+    FROM (
+        SELECT rows.*, CAST(rows.worked_hours AS double precision) - rows.std_hours as diff
+        FROM ({rows}) rows
+    ) m
+    GROUP BY m."Shift", m."Department", m.std_hours
+"""
+
+MANDAYS_SUMMARY = Statement('mandays_summary', _MANDAYS_SUMMARY.replace('{rows}', MANDAYS_ROWS.sql))
+
+# Man-days ledger rows: the measures per day, scope (company, plant, contractor,
+# supervisor), shift and department, for employees active when the day is built.
+# ledger.py persists them into hr_mandays_ledger; {days} limits the swipes read.
+MANDAYS_LEDGER_COLUMNS = ['day', 'company_id', 'plant_id', 'contractor_id', 'parent_id', 'shift', 'department', 'std_hours',
+                          'total_emp'] + [name.lower() for name in MANDAYS_MEASURES]
+
+MANDAYS_LEDGER_DAYS = Statement('mandays_ledger_days', """
+    SELECT DATE(a.check_in) as day, e.company_id, e.plant_id, e.contractor_id, e.parent_id,
+        COALESCE(s.name, 'No Shift') as shift, COALESCE(d.name, 'Unknown') as department,
+        COALESCE(s.hours_per_day, 8) as std_hours,
+        COUNT(DISTINCT e.id) as total_emp,
+        """ + ",\n        ".join(f"{expr} as {name.lower()}" for name, expr in MANDAYS_MEASURES.items()) + """
+    FROM hr_attendance a
+    JOIN hr_employee e ON a.employee_id = e.id
+    LEFT JOIN resource_calendar s ON a.assigned_shift_id = s.id
+    LEFT JOIN hr_department d ON e.department_id = d.id
+    CROSS JOIN LATERAL (
+        SELECT CAST(EXTRACT(EPOCH FROM (a.check_out - a.check_in))/3600 AS double precision) - COALESCE(s.hours_per_day, 8) as diff
+    ) m
+    WHERE e.active = true AND a.check_out IS NOT NULL AND {days}
+    GROUP BY DATE(a.check_in), e.company_id, e.plant_id, e.contractor_id, e.parent_id, s.name, d.name, s.hours_per_day
+""")
+
+# Ledger rows of a date range summed per shift and department: employee-days
+# (all days, and working days i.e. not Sundays), peak daily headcount and the measures. {source} is hr_mandays_ledger or, while
+# the ledger is off, the same rows computed live; {where} filters `l`.
+_MANDAYS_LEDGER_RANGE = """
+    SELECT t.shift as "Shift", t.department as "Department", t.std_hours,
+        SUM(t.total_emp) as "Emp_Days", SUM(t.total_emp) FILTER (WHERE EXTRACT(ISODOW FROM t.day) <> 7) as "Work_Emp_Days",
+        MAX(t.total_emp) as "Peak_Emp",
+        """ + ", ".join(f'SUM(t.{name.lower()}) as "{name}"' for name in MANDAYS_MEASURES) + """
+    FROM (
+        SELECT l.day, l.shift, l.department, l.std_hours, SUM(l.total_emp) as total_emp,
+            """ + ", ".join(f"SUM(l.{name.lower()}) as {name.lower()}" for name in MANDAYS_MEASURES) + """
+        FROM {source} l
+        WHERE {where}
+        GROUP BY l.day, l.shift, l.department, l.std_hours
+    ) t
+    GROUP BY t.shift, t.department, t.std_hours
+"""
+
+MANDAYS_LEDGER_RANGE = Statement('mandays_ledger_range', _MANDAYS_LEDGER_RANGE.replace('{source}', 'hr_mandays_ledger'))
+
+MANDAYS_LEDGER_RANGE_LIVE = Statement('mandays_ledger_range_live',
+    _MANDAYS_LEDGER_RANGE.replace('{source}', '(' + MANDAYS_LEDGER_DAYS.sql + ')'))
+
+# ---------------------------------------------------------
+# 3. ROLLUP-BACKED VARIANTS (hr_attendance_daily)
+# ---------------------------------------------------------
+# Same output columns as the raw statements above, read from the per-employee
+# daily rollup maintained by rollup.py. Their date filter applies to `r.day`.
+# Only statements that are per employee-day anyway have a variant: the missed
+# check-out list (one row per open session) and man-days (each session's hours
+# compared with the shift on their own) always read raw swipes.
+
+ROLLUP_WATERMARK = Statement('rollup_watermark', """
+    SELECT MAX(refreshed_at) as max_id, MAX(last_write_date) as max_write_date
+    FROM dashboard_watermarks
+""")
+
+ATTENDANCE_SNAPSHOT_ROLLUP = Statement('attendance_snapshot_r', """
+    SELECT r.employee_id, e.department_id,
+        COALESCE(e.gender, 'Unknown') as gender,
+        COALESCE(e.skills_status, 'Unknown') as skills,
+        r.assigned_shift_id as shift_id, e.contractor_id
+    FROM hr_attendance_daily r
+    JOIN hr_employee e ON r.employee_id = e.id
+    WHERE {where}
+""")
+
+DAILY_PRESENT_COUNTS_ROLLUP = Statement('daily_present_r', """
+    SELECT r.day, COUNT(*) as present
+    FROM hr_attendance_daily r
+    JOIN hr_employee e ON r.employee_id = e.id
+    WHERE {where}
+    GROUP BY r.day
+""")
+
+SUPERVISOR_DAILY_PRESENT_COUNTS_ROLLUP = Statement('supervisor_daily_present_r', """
+    SELECT e.parent_id as supervisor_id, r.day, COUNT(*) as present
+    FROM hr_attendance_daily r
+    JOIN hr_employee e ON r.employee_id = e.id
+    WHERE {where}
+    GROUP BY e.parent_id, r.day
+""")
+
+MULTIPLE_CHECKINS_ROLLUP = Statement('multiple_checkins_r', """
+    SELECT r.day as "Date", e.name as "Name", e.employee_code as "Employee Code", r.swipe_count as "Count"
+    FROM hr_attendance_daily r LEFT JOIN hr_employee e ON r.employee_id = e.id
+    WHERE r.swipe_count > 1 AND {where}
+    ORDER BY "Date" DESC LIMIT 50
+""")
+
+_ANOMALY_EMPLOYEE_DAYS_ROLLUP = """(
+        SELECT r.employee_id, r.day, r.swipe_count as swipes,
+            r.open_sessions
+        FROM hr_attendance_daily r JOIN hr_employee e ON r.employee_id = e.id
+        WHERE {scan}
+    ) g"""
+
+ANOMALY_DAILY_COUNTS_ROLLUP = Statement('anomaly_daily_counts_r',
+    ANOMALY_DAILY_COUNTS.sql.replace(_ANOMALY_EMPLOYEE_DAYS, _ANOMALY_EMPLOYEE_DAYS_ROLLUP))
+
+ANOMALY_EMPLOYEE_DAYS_ROLLUP = Statement('anomaly_employee_days_r',
+    ANOMALY_EMPLOYEE_DAYS.sql.replace(_ANOMALY_EMPLOYEE_DAYS, _ANOMALY_EMPLOYEE_DAYS_ROLLUP))
+
+ROLLUP_VARIANTS = {
+    ATTENDANCE_SNAPSHOT: ATTENDANCE_SNAPSHOT_ROLLUP,
+    DAILY_PRESENT_COUNTS: DAILY_PRESENT_COUNTS_ROLLUP,
+    SUPERVISOR_DAILY_PRESENT_COUNTS: SUPERVISOR_DAILY_PRESENT_COUNTS_ROLLUP,
+    MULTIPLE_CHECKINS: MULTIPLE_CHECKINS_ROLLUP,
+    ANOMALY_DAILY_COUNTS: ANOMALY_DAILY_COUNTS_ROLLUP,
+    ANOMALY_EMPLOYEE_DAYS: ANOMALY_EMPLOYEE_DAYS_ROLLUP,
+}
+
+# ---------------------------------------------------------
+# 4. ANOMALY-STORE VARIANTS (hr_attendance_anomaly)
+# ---------------------------------------------------------
+# Same output columns as the anomaly statements above, read from the open rows
+# written by anomalies.py (one per employee-day and kind). Their date filter
+# applies to `x.day`.
+
+MISSED_CHECKOUTS_STORE = Statement('missed_checkouts_x', """
+    SELECT x.day as "Date", e.name as "Name", e.employee_code as "Employee Code"
+    FROM hr_attendance_anomaly x LEFT JOIN hr_employee e ON x.employee_id = e.id
+    WHERE x.kind = 'missed_checkout' AND x.status = 'open' AND {where}
+    ORDER BY x.first_check_in DESC LIMIT 50
+""")
+
+MULTIPLE_CHECKINS_STORE = Statement('multiple_checkins_x', """
+    SELECT x.day as "Date", e.name as "Name", e.employee_code as "Employee Code", x.swipe_count as "Count"
+    FROM hr_attendance_anomaly x LEFT JOIN hr_employee e ON x.employee_id = e.id
+    WHERE x.kind = 'multiple_checkin' AND x.status = 'open' AND {where}
+    ORDER BY "Date" DESC LIMIT 50
+""")
+
+# Both kinds of an employee-day carry the same facts, refreshed on every detection
+_ANOMALY_EMPLOYEE_DAYS_STORE = """(
+        SELECT x.employee_id, x.day, MAX(x.swipe_count) as swipes, MAX(x.open_sessions) as open_sessions
+        FROM hr_attendance_anomaly x JOIN hr_employee e ON x.employee_id = e.id
+        WHERE x.status = 'open' AND {scan}
+        GROUP BY x.employee_id, x.day
+    ) g"""
+
+ANOMALY_DAILY_COUNTS_STORE = Statement('anomaly_daily_counts_x',
+    ANOMALY_DAILY_COUNTS.sql.replace(_ANOMALY_EMPLOYEE_DAYS, _ANOMALY_EMPLOYEE_DAYS_STORE))
+
+ANOMALY_EMPLOYEE_DAYS_STORE = Statement('anomaly_employee_days_x',
+    ANOMALY_EMPLOYEE_DAYS.sql.replace(_ANOMALY_EMPLOYEE_DAYS, _ANOMALY_EMPLOYEE_DAYS_STORE))
+
+ANOMALY_STORE_VARIANTS = {
+    MISSED_CHECKOUTS: MISSED_CHECKOUTS_STORE,
+    MULTIPLE_CHECKINS: MULTIPLE_CHECKINS_STORE,
+    ANOMALY_DAILY_COUNTS: ANOMALY_DAILY_COUNTS_STORE,
+    ANOMALY_EMPLOYEE_DAYS: ANOMALY_EMPLOYEE_DAYS_STORE,
+}
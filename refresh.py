@@ -0,0 +1,76 @@
+import logging
+import threading
+import time
+from datetime import timedelta
+from sqlalchemy import text
+from utils import maintenance_connection
+
+# ---------------------------------------------------------
+# INCREMENTAL REFRESH JOBS
+# ---------------------------------------------------------
+# Shared by rollup.py, anomalies.py and ledger.py. A run holds a per-database
+# advisory lock, reads the hr_attendance.write_date it processed last from
+# dashboard_watermarks, rebuilds what changed since then and stores the new mark
+# in the same transaction. Days that lost swipes (deleted, or moved to another
+# day or employee) come from hr_attendance_changes (migration 0007) on the same
+# clock. Rebuilds are idempotent, so the OVERLAP window (for transactions that
+# commit after a later write_date) costs nothing extra.
+
+OVERLAP = timedelta(minutes=5)
+
+log = logging.getLogger(__name__)
+
+def touched_days(conn, since):
+    """Days with swipes written or removed since `since` (every day with swipes when None), oldest first."""
+    if since is None:
+        rows = conn.execute(text("SELECT DISTINCT DATE(check_in) FROM hr_attendance WHERE check_in IS NOT NULL"))
+    else:
+        rows = conn.execute(text("""
+            SELECT DATE(check_in) FROM hr_attendance WHERE write_date >= :since AND check_in IS NOT NULL
+            UNION SELECT day FROM hr_attendance_changes WHERE changed_at >= :since
+        """), {'since': since})
+    return sorted(row[0] for row in rows)
+
+def refresh_incremental(name, lock_key, rebuild, full=False, change_logs=()):
+    """
+    Runs `rebuild(conn, since)` for job `name` under advisory lock `lock_key`, where
+    `since` is the write_date to pick up from (OVERLAP already subtracted), or None
+    to rebuild everything (`full`, or no watermark yet). The changed_at of
+    `change_logs` (trigger-fed tables like hr_attendance_changes) moves the
+    watermark too, for rebuilds that read them. Returns rebuild's result,
+    or None when another run holds the lock. A result of 0 (or all zeros) means
+    nothing was rebuilt and leaves refreshed_at, which readers key caches on, alone.
+    """
+    with maintenance_connection.begin() as conn:
+        # Only one run per job (per database) at a time
+        if not conn.execute(text("SELECT pg_try_advisory_xact_lock(:k)"), {'k': lock_key}).scalar():
+            return None
+        since = None if full else conn.execute(text("SELECT last_write_date FROM dashboard_watermarks WHERE name = :n"), {'n': name}).scalar()
+        marks = ["(SELECT MAX(write_date) FROM hr_attendance)"] + [f"(SELECT MAX(changed_at) FROM {t})" for t in ('hr_attendance_changes',) + tuple(change_logs)]
+        new_mark = conn.execute(text(f"SELECT GREATEST({', '.join(marks)})")).scalar()
+        result = rebuild(conn, since - OVERLAP if since is not None else None)
+        changed = any(result) if isinstance(result, tuple) else bool(result)
+        conn.execute(text("""
+            INSERT INTO dashboard_watermarks (name, last_write_date, refreshed_at) VALUES (:n, :w, now())
+            ON CONFLICT (name) DO UPDATE SET last_write_date = EXCLUDED.last_write_date,
+                refreshed_at = CASE WHEN :changed THEN now() ELSE dashboard_watermarks.refreshed_at END
+        """), {'n': name, 'w': new_mark if new_mark is not None else since, 'changed': changed})
+        # Every job has read the change log up to its own watermark
+        conn.execute(text("""
+            DELETE FROM hr_attendance_changes
+            WHERE changed_at < (SELECT MIN(last_write_date) FROM dashboard_watermarks) - :overlap
+        """), {'overlap': OVERLAP})
+    return result
+
+def start_refresher(fn, name, interval_seconds=60):
+    """Calls `fn()` on a daemon thread every `interval_seconds`; failures are reported and retried."""
+    def loop():
+        while True:
+            try:
+                fn()
+            except Exception:
+                log.exception("Refresh job %s failed", name)
+            time.sleep(interval_seconds)
+    thread = threading.Thread(target=loop, name=name, daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,101 @@
+import pandas as pd
+from fpdf import FPDF
+
+# ---------------------------------------------------------
+# PDF TABLE REPORTS
+# ---------------------------------------------------------
+# Rows arrive as DataFrame chunks (e.g. from utils.stream_sql), so only one
+# chunk of rows is held at a time. Each chunk is formatted column-wise with pandas
+# (text, truncation, latin-1) and laid out into pages with the column header
+# repeated on every page. Column widths are sized from the first chunk and fitted
+# to the page. FPDF keeps every rendered page in memory until pdf.output writes
+# the document to a file (never returned through a callback), so memory still
+# grows with the page count.
+
+FONT = "Arial"
+FONT_SIZE = 8
+HEADER_HEIGHT = 8
+ROW_HEIGHT = 7
+MAX_CELL_CHARS = 40
+CELL_PADDING_MM = 2
+
+class TableReport(FPDF):
+    def __init__(self, title, headers):
+        super().__init__(orientation='L', unit='mm', format='A4')
+        self.title_text = title
+        self.headers = headers
+        self.widths = []
+        self.set_auto_page_break(True, margin=12)
+        self.set_font(FONT, size=FONT_SIZE)
+        # Average glyph width, used to turn widths into character budgets
+        sample = "abcdefghijklmnopqrstuvwxyz0123456789 "
+        self.char_width = self.get_string_width(sample) / len(sample)
+
+    def header(self):
+        if self.page_no() == 1:
+            self.set_font(FONT, 'B', 14)
+            self.cell(0, 10, txt=self.title_text, ln=True, align='C')
+            self.ln(5)
+        self.set_font(FONT, 'B', FONT_SIZE)
+        for width, text in zip(self.widths, self.headers):
+            self.cell(width, HEADER_HEIGHT, self.fit(text, width), border=1, align='C')
+        self.ln()
+        self.set_font(FONT, size=FONT_SIZE)
+
+    def footer(self):
+        self.set_y(-10)
+        self.set_font(FONT, 'I', FONT_SIZE)
+        self.cell(0, 5, f"Page {self.page_no()}", align='R')
+
+    def fit(self, text, width):
+        return str(text)[:self.char_budget(width)]
+
+    def char_budget(self, width):
+        return max(1, int((width - CELL_PADDING_MM) / self.char_width))
+
+def column_widths(pdf, sample, headers):
+    """Widths (mm) proportional to each column's longest typical cell, fitted to the page width."""
+    lengths = []
+    for col, header in zip(sample.columns, headers):
+        cells = sample[col].astype(str).str.len()
+        typical = int(cells.quantile(0.95)) if len(cells) else 0
+        lengths.append(max(len(str(header)), min(typical, MAX_CELL_CHARS), 3))
+    natural = [n * pdf.char_width + CELL_PADDING_MM for n in lengths]
+    scale = (pdf.w - pdf.l_margin - pdf.r_margin) / sum(natural)
+    return [w * scale for w in natural]
+
+def format_cells(df, pdf):
+    """Column-wise: text, empty for missing values, truncated to fit, latin-1 safe."""
+    out = pd.DataFrame(index=df.index)
+    for col, width in zip(df.columns, pdf.widths):
+        text = df[col].astype(object).where(df[col].notna(), "").astype(str)
+        out[col] = text.str.slice(0, pdf.char_budget(width)).str.encode('latin-1', 'replace').str.decode('latin-1')
+    return out
+
+def write_table_pdf(path, title, frames, columns, headers=None, numbered=True, total=None, progress=None):
+    """
+    Renders `frames` (DataFrames with `columns`) as a landscape A4 table into
+    `path`, with a running "S.No" column if `numbered`. `progress(rows_done, total)`
+    is called after every chunk and may raise to abort the report.
+    """
+    headers = (["S.No"] if numbered else []) + list(headers or columns)
+    pdf = TableReport(title, headers)
+    done = 0
+    for df in frames:
+        df = df[list(columns)].copy()
+        if numbered: df.insert(0, "S.No", range(done + 1, done + 1 + len(df)))
+        if not pdf.widths:
+            pdf.widths = column_widths(pdf, df, headers)
+            pdf.add_page()
+        for row in format_cells(df, pdf).itertuples(index=False, name=None):
+            for width, text in zip(pdf.widths, row):
+                pdf.cell(width, ROW_HEIGHT, text, border=1, align='C')
+            pdf.ln()
+        done += len(df)
+        if progress: progress(done, total)
+    if not pdf.widths:
+        pdf.widths = column_widths(pdf, pd.DataFrame(columns=headers), headers)
+        pdf.add_page()
+        pdf.cell(0, ROW_HEIGHT, "No data.", ln=True)
+    pdf.output(path, 'F')
+    return done
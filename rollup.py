@@ -0,0 +1,53 @@
+import sys
+from datetime import timedelta
+from sqlalchemy import text
+from refresh import refresh_incremental, start_refresher, touched_days
+
+# ---------------------------------------------------------
+# DAILY ATTENDANCE ROLLUP (hr_attendance_daily)
+# ---------------------------------------------------------
+# Each run recomputes only the days that have swipes written since the stored
+# watermark (see refresh.py).
+
+WATERMARK_NAME = 'attendance_daily'
+REBUILD_CHUNK_DAYS = 31
+ADVISORY_LOCK_KEY = 48151623
+
+REBUILD_DAYS = text("""
+    INSERT INTO hr_attendance_daily
+        (employee_id, day, first_check_in, last_check_out, swipe_count, has_open_session, open_sessions, assigned_shift_id, worked_hours)
+    SELECT a.employee_id, DATE(a.check_in),
+        MIN(a.check_in),
+        MAX(a.check_out),
+        COUNT(*),
+        BOOL_OR(a.check_out IS NULL),
+        COUNT(*) FILTER (WHERE a.check_out IS NULL),
+        (ARRAY_AGG(a.assigned_shift_id ORDER BY a.check_in))[1],
+        COALESCE(SUM(EXTRACT(EPOCH FROM (a.check_out - a.check_in)) / 3600), 0)
+    FROM hr_attendance a
+    WHERE a.check_in >= :range_start AND a.check_in < :range_end
+      AND DATE(a.check_in) = ANY(:days)
+      AND a.employee_id IS NOT NULL
+    GROUP BY a.employee_id, DATE(a.check_in)
+""")
+
+def _rebuild(conn, since):
+    days = touched_days(conn, since)
+    if since is None: conn.execute(text("TRUNCATE hr_attendance_daily"))
+    for i in range(0, len(days), REBUILD_CHUNK_DAYS):
+        chunk = days[i:i + REBUILD_CHUNK_DAYS]
+        conn.execute(text("DELETE FROM hr_attendance_daily WHERE day = ANY(:days)"), {'days': chunk})
+        conn.execute(REBUILD_DAYS, {'days': chunk, 'range_start': chunk[0], 'range_end': chunk[-1] + timedelta(days=1)})
+    return len(days)
+
+def refresh_attendance_rollup(full=False):
+    """Brings hr_attendance_daily up to date; returns the number of days rebuilt."""
+    return refresh_incremental(WATERMARK_NAME, ADVISORY_LOCK_KEY, _rebuild, full) or 0
+
+def start_rollup_refresher(interval_seconds=60):
+    """Refreshes the rollup on a daemon thread every `interval_seconds`."""
+    return start_refresher(refresh_attendance_rollup, 'attendance-rollup', interval_seconds)
+
+if __name__ == '__main__':
+    rebuilt = refresh_attendance_rollup(full='--full' in sys.argv)
+    print(f"Rebuilt {rebuilt} day(s) of hr_attendance_daily.")
@@ -0,0 +1,122 @@
+import os
+import sys
+from datetime import date, timedelta
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+# ---------------------------------------------------------
+# MAN-DAYS ENGINE PARITY
+# ---------------------------------------------------------
+# read_mandays_summary (one grouped query) must match the pandas fold
+# (summarize_mandays over mandays_per_employee) row for row, on raw swipes and on
+# the daily rollup; and switching the rollup on must not change man-days or the
+# anomaly lists the pages show. Runs against a throwaway database that bench.generate wipes
+# and refills, so it is skipped unless one is named:
+#
+#   HR_TEST_DB_URL=postgresql://localhost:5432/hr_test python -m pytest tests
+
+TEST_DB_URL = os.environ.get('HR_TEST_DB_URL')
+if not TEST_DB_URL:
+    pytest.skip("HR_TEST_DB_URL is not set", allow_module_level=True)
+
+# utils connects to HR_DB_URL at import
+os.environ['HR_DB_URL'] = TEST_DB_URL
+os.environ.pop('HR_DB_REPLICA_URL', None)
+os.environ.pop('HR_SHARED_CACHE_DIR', None)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import migrate
+import rollup
+import utils
+from bench import generate
+from queries import Filters, ANOMALY_EMPLOYEE_DAYS, ANOMALY_KINDS, ANOMALY_PAGE_KEYS, MISSED_CHECKOUTS
+
+START = date(2025, 3, 3)
+DAYS = 45
+RANGES = pytest.mark.parametrize('start_offset, end_offset', [(2, None), (0, 6), (0, 30), (None, None)],
+                                 ids=['day', 'week', 'month', 'undated'])
+
+@pytest.fixture(scope='module')
+def scopes():
+    generate.generate(generate.parse_args(['--employees', '400', '--days', str(DAYS), '--start', START.isoformat(),
+                                           '--plants', '2', '--contractors', '5', '--departments', '4', '--reset']))
+    migrate.migrate()
+    rollup.refresh_attendance_rollup(full=True)
+    utils.result_cache.clear()
+    with utils.db_connection.connect() as conn:
+        # The largest team and contractor crew, so every case below has rows
+        company, plant, supervisor, contractor_company, contractor_plant, contractor = (
+            value for column in ('parent_id', 'contractor_id') for value in conn.execute(text(f"""
+                SELECT company_id, plant_id, {column} FROM hr_employee WHERE active AND {column} IS NOT NULL
+                GROUP BY 1, 2, 3 ORDER BY COUNT(*) DESC, 3 LIMIT 1
+            """)).one())
+    return {
+        'plant': {'company_id': company, 'plant_id': plant, 'empid': None, 'contractor_id': None},
+        'supervisor': {'company_id': company, 'plant_id': plant, 'empid': supervisor, 'contractor_id': None},
+        'contractor': {'company_id': contractor_company, 'plant_id': contractor_plant, 'empid': None, 'contractor_id': contractor},
+    }
+
+@pytest.fixture(params=[False, True], ids=['raw', 'rollup'])
+def rollup_mode(request, monkeypatch):
+    monkeypatch.setattr(utils, 'USE_ATTENDANCE_ROLLUP', request.param)
+    return request.param
+
+def dates(start_offset, end_offset):
+    return tuple(START + timedelta(days=offset) if offset is not None else None for offset in (start_offset, end_offset))
+
+def both_engines(user_data, start_date, end_date):
+    statement, filters = utils.mandays_filters(user_data, start_date, end_date)
+    rows = utils.read_sql(statement, where=filters, cache=False)
+    expected = utils.summarize_mandays(utils.mandays_per_employee(rows)) if not rows.empty else None
+    return utils.read_mandays_summary(user_data, start_date, end_date), expected
+
+@pytest.mark.parametrize('scope', ['plant', 'supervisor', 'contractor'])
+@RANGES
+def test_engines_agree(scopes, rollup_mode, scope, start_offset, end_offset):
+    actual, expected = both_engines(scopes[scope], *dates(start_offset, end_offset))
+    assert expected is not None, "the generated data should cover this case"
+    pd.testing.assert_frame_equal(actual.reset_index(drop=True), expected.reset_index(drop=True))
+
+# Second sessions can run past midnight of the last generated day, hence DAYS + 1
+@pytest.mark.parametrize('scope', ['plant', 'contractor'])
+@pytest.mark.parametrize('start_date, end_date', [(START - timedelta(days=30), None), (START + timedelta(days=DAYS + 1), START + timedelta(days=DAYS + 10))],
+                         ids=['before', 'after'])
+def test_engines_agree_on_empty_ranges(scopes, rollup_mode, scope, start_date, end_date):
+    assert both_engines(scopes[scope], start_date, end_date) == (None, None)
+
+def in_both_modes(monkeypatch, read):
+    results = []
+    for flag in (False, True):
+        monkeypatch.setattr(utils, 'USE_ATTENDANCE_ROLLUP', flag)
+        results.append(read())
+    return results
+
+@pytest.mark.parametrize('scope', ['plant', 'supervisor', 'contractor'])
+@RANGES
+def test_rollup_keeps_mandays(scopes, monkeypatch, scope, start_offset, end_offset):
+    raw, rolled = in_both_modes(monkeypatch, lambda: utils.read_mandays_summary(scopes[scope], *dates(start_offset, end_offset)))
+    assert raw is not None
+    pd.testing.assert_frame_equal(rolled.reset_index(drop=True), raw.reset_index(drop=True))
+
+@pytest.mark.parametrize('scope', ['plant', 'contractor'])
+@pytest.mark.parametrize('kind', sorted(ANOMALY_KINDS))
+def test_rollup_keeps_anomaly_days(scopes, monkeypatch, scope, kind):
+    # The range view's employee-days, with their check-in and open-session counts
+    def read():
+        statement, day_column = utils.attendance_statement(ANOMALY_EMPLOYEE_DAYS)
+        scan = Filters().user_scope(scopes[scope]).date_range(START, START + timedelta(days=DAYS - 1), column=day_column)
+        return utils.read_page(statement, ANOMALY_PAGE_KEYS, page_size=100_000, where=Filters(ANOMALY_KINDS[kind]), scan=scan)[0]
+    raw, rolled = in_both_modes(monkeypatch, read)
+    assert not raw.empty
+    pd.testing.assert_frame_equal(rolled, raw, check_dtype=False)
+
+@pytest.mark.parametrize('scope', ['plant', 'contractor'])
+def test_rollup_keeps_missed_checkouts(scopes, monkeypatch, scope):
+    def read():
+        statement, day_column = utils.attendance_statement(MISSED_CHECKOUTS)
+        where = Filters().user_scope(scopes[scope]).date_range(START, START + timedelta(days=DAYS - 1), column=day_column)
+        return utils.read_sql(statement, where=where, cache=False)
+    raw, rolled = in_both_modes(monkeypatch, read)
+    assert not raw.empty
+    pd.testing.assert_frame_equal(rolled, raw)